@@ -119,45 +119,16 @@ export default function HomeScreen() {
     setError(null);
 
     try {
-      // Load all data concurrently
-      const [
-        featuredData,
-        bestSellersData,
-        newArrivalsData,
-        categoriesData
-      ] = await Promise.allSettled([
-        ProductService.getFeaturedProducts(),
-        ProductService.getBestSellers(),
-        ProductService.getNewArrivals(),
-        ProductService.getCategories()
-      ]);
-
-      // Handle featured products
-      if (featuredData.status === 'fulfilled') {
-        setFeaturedProducts(featuredData.value);
-      } else {
-        console.warn('Failed to load featured products:', featuredData.reason);
-      }
-
-      // Handle best sellers
-      if (bestSellersData.status === 'fulfilled') {
-        setBestSellers(bestSellersData.value);
-      } else {
-        console.warn('Failed to load best sellers:', bestSellersData.reason);
-      }
-
-      // Handle new arrivals
-      if (newArrivalsData.status === 'fulfilled') {
-        setNewArrivals(newArrivalsData.value);
-      } else {
-        console.warn('Failed to load new arrivals:', newArrivalsData.reason);
-      }
-
-      // Handle categories
-      if (categoriesData.status === 'fulfilled') {
-        setCategories(categoriesData.value);
+      // One request for every section, scoped to the selected city
+      const home = await ProductService.getHome(selectedCity);
+      setFeaturedProducts(home.featured);
+      setBestSellers(home.bestSellers);
+      setNewArrivals(home.newArrivals);
+      setCategories(home.categories);
+
+      if (home.categories.length > 0) {
         // Update display categories with API data
-        const apiCategories = categoriesData.value.map((cat, index) => {
+        const apiCategories = home.categories.map((cat, index) => {
           const defaultCat = DEFAULT_CATEGORIES.find(dc => dc.name.toLowerCase() === cat.toLowerCase()) || DEFAULT_CATEGORIES[index % DEFAULT_CATEGORIES.length];
           return {
             id: index + 1,
@@ -168,21 +139,10 @@ export default function HomeScreen() {
         });
         setDisplayCategories(apiCategories);
       } else {
-        console.warn('Failed to load categories:', categoriesData.reason);
         // Keep default categories
         setDisplayCategories(DEFAULT_CATEGORIES);
       }
 
-      // If city is selected, filter products by city
-      if (selectedCity && selectedCity !== 'All Cities') {
-        try {
-          const cityProducts = await ProductService.getProductsByCity(selectedCity);
-          setFeaturedProducts(cityProducts.slice(0, 8));
-        } catch (cityError) {
-          console.warn('Failed to load city products:', cityError);
-        }
-      }
-
     } catch (error: any) {
       console.error('Error loading data:', error);
       setError(error.message || 'Failed to load data. Please check your connection.');
@@ -18,7 +18,7 @@ export default function TrackOrderScreen() {
     currentLocation?: string;
     history: {
       status: string;
-      timestamp: string;
+      timestamp: string | null;
       location?: string;
     }[];
   } | null>(null);
@@ -161,9 +161,11 @@ export default function TrackOrderScreen() {
               />
               <Text style={styles.historyStatusText}>{item.status}</Text>
             </View>
-            <Text style={styles.historyTimestamp}>
-              {new Date(item.timestamp).toLocaleString()}
-            </Text>
+            {item.timestamp && (
+              <Text style={styles.historyTimestamp}>
+                {new Date(item.timestamp).toLocaleString()}
+              </Text>
+            )}
             {item.location && (
               <Text style={styles.historyLocation}>{item.location}</Text>
             )}
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# backend/archive.py
+"""
+Move old, finished orders out of the hot tables.
+
+Orders that are Delivered or Cancelled and were placed more than
+ARCHIVE_AFTER_DAYS ago move, together with their order_items and
+shop_orders rows, into *_archive tables with the same columns. Each batch is one transaction
+(copy, then delete), and the job pauses between batches so it doesn't
+starve live traffic. The hot tables and their indexes then stay the size
+of the recent working set.
+
+MySQL partitioning would be the other way to do this, but InnoDB doesn't
+allow partitioned tables to have foreign keys, so both databases use
+archive tables.
+
+Usage:
+    python archive.py [--days N] [--batch-size N] [--pause SECONDS] [--dry-run]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Index, Table, func, select
+
+ARCHIVE_STATUSES = ('Delivered', 'Cancelled')
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_PAUSE_SECONDS = 0.5
+
+
+def archive_table(table, *indexes):
+    """<name>_archive with the same columns as `table` but no foreign keys,
+    so rows can be moved in before (or without) their parents"""
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable, autoincrement=False)
+        for c in table.columns
+    ]
+    archive = Table(f"{table.name}_archive", table.metadata, *columns)
+    for index_columns in indexes:
+        Index(f"ix_{archive.name}_{'_'.join(index_columns)}", *(archive.c[c] for c in index_columns))
+    return archive
+
+
+class Archiver:
+    """Moves orders and their child rows between hot and archive tables.
+
+    `orders` and `orders_archive` are the order tables; `children` is a list
+    of (hot table, archive table) pairs keyed by an order_id column.
+    """
+
+    def __init__(self, orders, orders_archive, children):
+        self.orders = orders
+        self.orders_archive = orders_archive
+        self.children = children
+
+    def eligible(self, cutoff):
+        return select(self.orders.c.id).where(
+            self.orders.c.status.in_(ARCHIVE_STATUSES),
+            self.orders.c.created_at < cutoff,
+        )
+
+    def count_eligible(self, conn, cutoff):
+        return conn.execute(select(func.count()).select_from(self.eligible(cutoff).subquery())).scalar()
+
+    def move_batch(self, conn, order_ids):
+        """Copy the orders and their rows to the archive, then delete them from the hot tables"""
+        moves = [(self.orders, self.orders_archive, self.orders.c.id)]
+        moves += [(hot, archive, hot.c.order_id) for hot, archive in self.children]
+        for hot, archive, key in moves:
+            names = [c.name for c in hot.columns]
+            conn.execute(archive.insert().from_select(names, select(*hot.columns).where(key.in_(order_ids))))
+        # Children first: the hot tables have foreign keys to orders
+        for hot, _, key in reversed(moves):
+            conn.execute(hot.delete().where(key.in_(order_ids)))
+
+    def run(self, engine, cutoff, batch_size=DEFAULT_BATCH_SIZE, pause=DEFAULT_PAUSE_SECONDS, max_batches=None):
+        """Archive everything eligible before `cutoff` in throttled batches. Returns orders moved."""
+        moved = batches = 0
+        while max_batches is None or batches < max_batches:
+            with engine.begin() as conn:
+                order_ids = list(conn.execute(
+                    self.eligible(cutoff).order_by(self.orders.c.id).limit(batch_size)
+                ).scalars())
+                if not order_ids:
+                    break
+                self.move_batch(conn, order_ids)
+            moved += len(order_ids)
+            batches += 1
+            if len(order_ids) < batch_size:
+                break
+            time.sleep(pause)
+        return moved
+
+
+def main(argv):
+    from app import create_app, db, order_archiver
+
+    app = create_app()
+
+    def option(name, cast, default):
+        return cast(argv[argv.index(name) + 1]) if name in argv else default
+
+    days = option('--days', int, app.config['ARCHIVE_AFTER_DAYS'])
+    batch_size = option('--batch-size', int, DEFAULT_BATCH_SIZE)
+    pause = option('--pause', float, DEFAULT_PAUSE_SECONDS)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    with app.app_context():
+        engine = db.engine
+        if '--dry-run' in argv:
+            with engine.connect() as conn:
+                print(f"{order_archiver.count_eligible(conn, cutoff)} orders older than {days} days would be archived")
+            return
+        moved = order_archiver.run(engine, cutoff, batch_size=batch_size, pause=pause)
+        print(f"Archived {moved} orders older than {days} days")
+
+
+if __name__ == '__main__':
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print(__doc__)
+        sys.exit(0)
+    main(sys.argv[1:])
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+# backend/asgi.py
+"""
+Optional async serving mode.
+
+    uvicorn asgi:app --workers 4
+
+The hot read endpoints in ASYNC_VIEWS run on the event loop against
+SQLAlchemy's asyncio engine, so a request waiting on the database costs a
+coroutine instead of a thread. Those requests still go through the Flask
+app for everything but the view itself: URL matching, JWT checks, the rate
+limits and replica eligibility declared on the sync route, error handlers
+and CORS headers. Every other route is handed to the same Flask app as
+WSGI on a thread pool, so nothing else changes.
+
+The long-poll and Server-Sent Events endpoints are async views too: an
+open stream is a coroutine waiting on its realtime.Hub subscription, and
+when the client disconnects the view is cancelled and unsubscribes. On the
+WSGI side each open stream would hold a pool thread for its whole lifetime.
+
+Request bodies reach WSGI routes as a stream pulled from the ASGI server
+while the app reads, so uploads are never buffered whole; async views get
+theirs buffered. Once a response has started, the server's receive channel
+is watched for the client going away, and a streamed WSGI response is
+closed at its next chunk after that.
+
+Needs an ASGI server (uvicorn) and the async driver for the database URL,
+see ASYNC_DRIVERS: aiosqlite for sqlite://, aiomysql for mysql://.
+
+Config:
+    ASYNC_POOL_SIZE: async DB connections per worker and engine (default 20)
+    ASYNC_WSGI_THREADS: threads for the routes served through WSGI (default 40)
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+from app import (
+    ORDER_FIELDS, PRODUCT_FIELDS, Order, build_order_documents, catalogue_listing, create_app,
+    customer_order_history, db, event_stream, include_archived, limiter, list_response, needs_order_details,
+    order_detail_queries, order_items, order_items_archive, order_shop_line_query, order_status_history_query,
+    order_topic, order_tracking_state, orders_archive, owned_shop_query, product_listing, product_listing_item,
+    project_orders, realtime_hub, replicas, requested_fields, shop_dashboard, shop_summary, shops_in_city,
+    status_history_items, too_many_streams, unrendered_orders, user_by_email_query,
+)
+from realtime import KEEPALIVE, ShopDashboard, sse
+
+# Database backend -> asyncio DBAPI driver
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'mysql': 'aiomysql',
+}
+
+
+def async_url(url):
+    """The same database URL with the backend's async driver"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+class AsyncEngines:
+    """Async engines for the primary (bind key None) and every read replica"""
+
+    def __init__(self, config):
+        urls = {None: config['SQLALCHEMY_DATABASE_URI']}
+        urls.update({key: url for key, url in config.get('SQLALCHEMY_BINDS', {}).items() if key.startswith('replica_')})
+        pool_size = int(config.get('ASYNC_POOL_SIZE', os.environ.get('ASYNC_POOL_SIZE', 20)))
+        self.engines = {key: self._create(url, pool_size) for key, url in urls.items()}
+
+    @staticmethod
+    def _create(url, pool_size):
+        url = async_url(url)
+        if url.get_backend_name() == 'sqlite':
+            return create_async_engine(url)
+        return create_async_engine(url, pool_size=pool_size, max_overflow=pool_size // 2, pool_recycle=3600)
+
+    def session(self, read_only=False):
+        """Session on a replica if this request may use one, otherwise on the primary"""
+        key = replicas.next_replica() if read_only and replicas.may_use_replica() else None
+        return AsyncSession(self.engines[key])
+
+    async def dispose(self):
+        for engine in self.engines.values():
+            await engine.dispose()
+
+
+# --- Async views ---
+# Twins of the sync routes with the same endpoint names. Each takes an
+# AsyncSession plus the URL arguments and returns what a Flask view returns.
+
+async def get_all_products(session):
+    fields = requested_fields(PRODUCT_FIELDS)
+    if fields is None:
+        return jsonify(message="Unknown field in ?fields="), 400
+    items = catalogue_listing(request.args, fields)
+    if items:
+        return list_response(items, fields)
+    rows = (await session.execute(product_listing(request.args, fields))).all()
+    if not rows:
+        return jsonify(message="No products found"), 404
+    return list_response([product_listing_item(row) for row in rows], fields)
+
+
+async def get_shops_by_city(session, city_name):
+    verify_jwt_in_request()
+    shops = (await session.execute(shops_in_city(city_name))).scalars().all()
+    if not shops:
+        return jsonify(message=f"No shops found in {city_name}"), 404
+    return jsonify([shop_summary(shop) for shop in shops]), 200
+
+
+async def order_listing(session, orders, fields, lines=order_items):
+    """Async order_listing() from app.py"""
+    if not needs_order_details(fields):
+        return project_orders(orders, None, fields)
+    rest = unrendered_orders(orders)
+    line_rows, addresses = [], []
+    if rest:
+        lines_query, addresses_query = order_detail_queries(rest, lines)
+        line_rows = (await session.execute(lines_query)).all()
+        if addresses_query is not None:
+            addresses = (await session.execute(addresses_query)).scalars().all()
+    return project_orders(orders, build_order_documents(orders, line_rows, addresses), fields)
+
+
+async def current_user(session):
+    verify_jwt_in_request()
+    return (await session.execute(user_by_email_query(get_jwt_identity()))).scalar()
+
+
+async def owned_shop(session, user):
+    return (await session.execute(owned_shop_query(user.id))).scalar()
+
+
+async def get_customer_orders(session):
+    customer = await current_user(session)
+    if not customer or customer.role != 'customer':
+        return jsonify(message="Customers only!"), 403
+    fields = requested_fields(ORDER_FIELDS)
+    if fields is None:
+        return jsonify(message="Unknown field in ?fields="), 400
+
+    orders = (await session.execute(customer_order_history(customer.id, fields=fields))).all()
+    result = await order_listing(session, orders, fields)
+    if include_archived():
+        archived = (await session.execute(customer_order_history(customer.id, orders_archive, fields))).all()
+        result += await order_listing(session, archived, fields, lines=order_items_archive)
+    return list_response(result, fields)
+
+
+async def can_view_order(session, user, order):
+    """Async can_view_order() from app.py"""
+    if user.role == 'customer':
+        return order.customer_id == user.id
+    if user.role == 'admin':
+        shop = await owned_shop(session, user)
+        return shop is not None and (await session.execute(order_shop_line_query(order.id, shop.id))).first() is not None
+    return False
+
+
+async def order_status_history(session, order_id):
+    return status_history_items((await session.execute(order_status_history_query(order_id))).all())
+
+
+async def track_order(session, order_id):
+    wait = min(request.args.get('wait', 0, type=int), 30)
+    since = request.args.get('version', type=int)
+
+    # Subscribe before reading the order so a change in between isn't missed
+    loop = asyncio.get_running_loop()
+    subscription = realtime_hub.subscribe(order_topic(order_id), loop) if wait > 0 and since is not None else None
+    try:
+        user = await current_user(session)
+        order = await session.get(Order, order_id)
+        if not user or not order or not await can_view_order(session, user, order):
+            return jsonify(message="Order not found"), 404
+
+        state = order_tracking_state(order, await order_status_history(session, order_id))
+        if subscription is None or order.status_version != since:
+            # Not waiting, already changed, or this worker is at its connection limit
+            state['changed'] = since is not None and order.status_version != since
+            return jsonify(state), 200
+
+        # Don't hold a pooled DB connection while waiting
+        await session.close()
+        try:
+            message = await subscription.get(wait)
+        except EOFError:
+            message = None
+        if message:
+            state.update(message, changed=True)
+            state['history'] = await order_status_history(session, order_id)
+        return jsonify(state), 200
+    finally:
+        if subscription is not None:
+            realtime_hub.unsubscribe(subscription)
+
+
+def subscription_stream(subscription, snapshot, event=None):
+    """The SSE response for a subscription: the snapshot, then each message (wrapped as `event` if given)"""
+    async def stream():
+        try:
+            yield sse(snapshot, event='snapshot')
+            while True:
+                message = await subscription.get(15)
+                if message and event:
+                    message = sse(message, event=event)
+                yield message or KEEPALIVE
+        except EOFError:
+            return
+
+    response = event_stream(stream())
+    # Runs however the stream ends, even if it never started
+    response.call_on_close(lambda: realtime_hub.unsubscribe(subscription))
+    return response
+
+
+async def stream_order_events(session, order_id):
+    user = await current_user(session)
+    order = await session.get(Order, order_id)
+    if not user or not order or not await can_view_order(session, user, order):
+        return jsonify(message="Order not found"), 404
+    history = await order_status_history(session, order_id)
+    await session.close()
+
+    subscription = realtime_hub.subscribe(order_topic(order_id), asyncio.get_running_loop())
+    if subscription is None:
+        return too_many_streams()
+    return subscription_stream(subscription, order_tracking_state(order, history), event='status')
+
+
+async def stream_real_time_metrics(session):
+    owner = await current_user(session)
+    if not owner or owner.role != 'admin':
+        return jsonify(message="Admins only!"), 403
+    shop = await owned_shop(session, owner)
+    if not shop:
+        return jsonify(message="Admin does not have a shop."), 404
+    await session.close()
+
+    subscription = realtime_hub.subscribe(ShopDashboard.topic(shop.id), asyncio.get_running_loop())
+    if subscription is None:
+        return too_many_streams()
+    try:
+        # The first read of the day loads the counters through the sync session
+        snapshot = await asyncio.to_thread(shop_dashboard.snapshot, shop.id)
+    except BaseException:
+        realtime_hub.unsubscribe(subscription)
+        raise
+    return subscription_stream(subscription, snapshot)
+
+
+ASYNC_VIEWS = {
+    'api.get_all_products': get_all_products,
+    'api.get_shops_by_city': get_shops_by_city,
+    'api.get_customer_orders': get_customer_orders,
+    'api.track_order': track_order,
+    'api.stream_order_events': stream_order_events,
+    'api.stream_real_time_metrics': stream_real_time_metrics,
+}
+
+
+# --- ASGI application ---
+
+def wsgi_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope"""
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name.encode().decode('latin1'),
+        'PATH_INFO': path.encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f"HTTP_{name}"
+        value = value.decode('latin1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+def response_start(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+    }
+
+
+class RequestBody(io.RawIOBase):
+    """wsgi.input read from ASGI receive() chunk by chunk as the app asks for it.
+
+    Reads come from a WSGI pool thread and hop onto the event loop for each
+    message. After watch(), receive() is only used to notice the client
+    going away; body the app had not read by then is dropped.
+    """
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._pending = memoryview(b'')
+        self._more = True
+        self._lock = asyncio.Lock()
+        self._watcher = None
+        self.disconnected = asyncio.Event()
+        self.gone = threading.Event()  # The same, for threads
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._pending and self._more:
+            self._pending = memoryview(asyncio.run_coroutine_threadsafe(self._next(), self._loop).result())
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+    async def read_all(self):
+        chunks = []
+        while self._more:
+            chunks.append(await self._next())
+        return b''.join(chunks)
+
+    async def _next(self):
+        async with self._lock:
+            if not self._more:
+                return b''
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self._disconnect()
+                return b''
+            self._more = message.get('more_body', False)
+            return message.get('body', b'')
+
+    def _disconnect(self):
+        self._more = False
+        self.disconnected.set()
+        self.gone.set()
+
+    def watch(self):
+        """Start waiting for http.disconnect in the background. Call on the event loop."""
+        if self._watcher is None:
+            self._watcher = asyncio.ensure_future(self._watch())
+
+    async def _watch(self):
+        self._more = False
+        while not self.disconnected.is_set():
+            async with self._lock:
+                message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self._disconnect()
+
+    def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+
+class AsyncApp:
+    """ASGI front for a Flask app: ASYNC_VIEWS on the event loop, the rest over WSGI"""
+
+    def __init__(self, flask_app, views=ASYNC_VIEWS):
+        self.flask_app = flask_app
+        self.views = views
+        self.engines = AsyncEngines(flask_app.config)
+        threads = int(flask_app.config.get('ASYNC_WSGI_THREADS', os.environ.get('ASYNC_WSGI_THREADS', 40)))
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        loop = asyncio.get_running_loop()
+        body = RequestBody(receive, loop)
+        environ = wsgi_environ(scope, body)
+        try:
+            endpoint, _ = self.flask_app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            endpoint = None
+        try:
+            if endpoint in self.views:
+                environ['wsgi.input'] = io.BytesIO(await body.read_all())
+                body.watch()
+                await self.until_disconnected(self.call_async(environ, send), body)
+            else:
+                async def respond(message):
+                    if message['type'] == 'http.response.start':
+                        body.watch()
+                    await send(message)
+                await loop.run_in_executor(self.executor, self.call_wsgi, environ, respond, body, loop)
+        finally:
+            body.stop_watching()
+
+    @staticmethod
+    async def until_disconnected(coro, body):
+        """Run `coro` to completion, or cancel it once the client has gone away"""
+        task = asyncio.ensure_future(coro)
+        disconnected = asyncio.ensure_future(body.disconnected.wait())
+        try:
+            await asyncio.wait((task, disconnected), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            disconnected.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.wait((task,))
+        if not task.cancelled():
+            task.result()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engines.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def call_async(self, environ, send):
+        """Run an async view inside a Flask request context, like Flask's own dispatch"""
+        app = self.flask_app
+        # Contexts are contextvars, so each request task sees only its own
+        with app.request_context(environ):
+            try:
+                response = app.preprocess_request()
+                if response is None:
+                    response = await self.dispatch()
+                response = app.make_response(response)
+            except Exception as e:
+                response = app.make_response(app.handle_user_exception(e))
+            response = app.process_response(response)
+            try:
+                await send(response_start(response.status_code, response.headers.to_wsgi_list()))
+                if hasattr(response.response, '__aiter__'):
+                    # Async streams (SSE) are forwarded chunk by chunk
+                    async for chunk in response.response:
+                        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                    await send({'type': 'http.response.body'})
+                else:
+                    await send({'type': 'http.response.body', 'body': response.get_data()})
+            finally:
+                if hasattr(response.response, 'aclose'):
+                    await response.response.aclose()
+                response.close()
+
+    async def dispatch(self):
+        # Limits and replica eligibility come from the decorators on the sync route
+        sync_view = self.flask_app.view_functions[request.endpoint]
+        for rate, key in getattr(sync_view, 'rate_limits', ()):
+            rejected = limiter.check(rate, key)
+            if rejected is not None:
+                return rejected
+        async with self.engines.session(getattr(sync_view, 'read_only', False)) as session:
+            return await self.views[request.endpoint](session, **request.view_args)
+
+    def call_wsgi(self, environ, send, body, loop):
+        """Serve one request through the Flask WSGI app. Runs on a pool thread."""
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [response_start(int(status.split(' ', 1)[0]), headers)]
+
+        result = self.flask_app(environ, start_response)
+        try:
+            for chunk in result:
+                if body.gone.is_set():
+                    # Servers drop sends to a gone client, so a stream would otherwise never end
+                    return
+                if started:
+                    send_sync(started.pop())
+                if chunk:
+                    # Streams (SSE) are forwarded chunk by chunk
+                    send_sync({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        if started:
+            send_sync(started.pop())
+        send_sync({'type': 'http.response.body'})
+
+
+app = AsyncApp(create_app())
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
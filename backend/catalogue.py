@@ -0,0 +1,306 @@
+# backend/catalogue.py
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from heapq import nlargest, nsmallest
+
+# Product list field -> array typecode (None: a plain list). Rows from the
+# loader hold these fields in this order; thumbnail_url is derived from image_url.
+COLUMNS = {
+    'id': 'q',
+    'name': None,
+    'price': 'd',
+    'image_url': None,
+    'shop_id': 'q',
+    'shop_name': None,
+    'city': None,
+    'quantity': 'q',
+    'category': None,
+    'discount_percentage': 'd',
+    'featured': 'b',
+    'unit': None,
+    'description': None,
+    'sold_count': 'q',
+    'rating': None,  # None without reviews
+    'rating_count': 'q',
+}
+FIELD_NAMES = list(COLUMNS)
+
+# Low-cardinality text columns: one shared string object per distinct value
+INTERNED = ('shop_name', 'city', 'category', 'unit')
+
+# ?sortBy= values served from memory; anything else goes to the database
+SORT_FIELDS = ('price', 'sold_count')
+INDEXED_FIELDS = ('shop_id', 'city', 'category', 'featured') + SORT_FIELDS
+
+
+class CatalogueSnapshot:
+    """An immutable copy of the catalogue: one array per field, rows ordered by id.
+
+    Indexes hold row positions (array('i')), so a position doubles as the id
+    order. `ranks[field][pos]` is the row's place in (field, id) order, which
+    sorts any filtered subset with a plain integer key.
+    """
+    __slots__ = ('size', 'columns', 'by_shop', 'by_city', 'by_category', 'featured', 'orders', 'ranks', 'loaded_at')
+
+    def __init__(self, rows, loaded_at=None):
+        rows = sorted(rows, key=lambda row: row[0])
+        self.size = len(rows)
+        self.loaded_at = loaded_at if loaded_at is not None else time.monotonic()
+        self.columns = {}
+        for i, (field, typecode) in enumerate(COLUMNS.items()):
+            values = [row[i] for row in rows]
+            if field in INTERNED:
+                values = [sys.intern(v) if v is not None else v for v in values]
+            self.columns[field] = array(typecode, values) if typecode else values
+        self.orders, self.ranks = {}, {}
+        self._index(INDEXED_FIELDS)
+
+    def _index(self, fields):
+        """(Re)build the indexes that depend on `fields`"""
+        if 'shop_id' in fields:
+            self.by_shop = self._group(self.columns['shop_id'])
+        if 'city' in fields:
+            self.by_city = self._group((city or '').lower() for city in self.columns['city'])
+        if 'category' in fields:
+            self.by_category = self._group(self.columns['category'])
+        if 'featured' in fields:
+            self.featured = array('i', (pos for pos, flag in enumerate(self.columns['featured']) if flag))
+        for field in SORT_FIELDS:
+            if field in fields:
+                column = self.columns[field]
+                # An old order is nearly sorted already, which Timsort handles in about linear time
+                order = self.orders.get(field, range(self.size))
+                order = array('i', sorted(order, key=lambda pos: (column[pos], pos)))
+                rank = array('i', bytes(4 * self.size))
+                for place, pos in enumerate(order):
+                    rank[pos] = place
+                self.orders[field], self.ranks[field] = order, rank
+
+    @staticmethod
+    def _group(values):
+        groups = {}
+        for pos, value in enumerate(values):
+            groups.setdefault(value, []).append(pos)
+        return {value: array('i', positions) for value, positions in groups.items()}
+
+    def rows(self):
+        """Every row as a tuple in COLUMNS order"""
+        return zip(*self.columns.values())
+
+    def patched(self, rows, deleted):
+        """A new snapshot with `rows` added or replaced and `deleted` ids removed; this one is left as it is"""
+        ids = self.columns['id']
+        positions = {}
+        for row in rows:
+            pos = bisect_left(ids, row[0])
+            if pos == self.size or ids[pos] != row[0]:
+                positions = None
+                break
+            positions[pos] = row
+        if deleted or positions is None:
+            # Inserts and deletes move rows: rebuild from scratch
+            replaced = {row[0] for row in rows} | set(deleted)
+            kept = [row for row in self.rows() if row[0] not in replaced]
+            return CatalogueSnapshot(kept + list(rows), self.loaded_at)
+
+        # Updates only: copy the columns, overwrite the rows in place and
+        # rebuild just the indexes over columns whose values changed
+        patched = object.__new__(CatalogueSnapshot)
+        patched.size, patched.loaded_at = self.size, self.loaded_at
+        patched.by_shop, patched.by_city, patched.by_category = self.by_shop, self.by_city, self.by_category
+        patched.featured, patched.orders, patched.ranks = self.featured, dict(self.orders), dict(self.ranks)
+        patched.columns = {field: column[:] for field, column in self.columns.items()}
+        changed = set()
+        for pos, row in positions.items():
+            for field, value in zip(FIELD_NAMES, row):
+                column = patched.columns[field]
+                if field in INTERNED and value is not None:
+                    value = sys.intern(value)
+                if column[pos] != value:
+                    column[pos] = value
+                    changed.add(field)
+        patched._index(changed & set(INDEXED_FIELDS))
+        return patched
+
+    def select(self, shop_id=None, city=None, category=None, featured=None, sort_by=None, ascending=False, limit=None):
+        """Row positions matching the filters, in the same order product_listing() sorts them"""
+        filters = []
+        if shop_id is not None:
+            filters.append(self.by_shop.get(shop_id, ()))
+        if city is not None:
+            # Same match as shops_in_city(): case-insensitive substring
+            needle = city.lower()
+            filters.append([pos for key, positions in self.by_city.items() if needle in key for pos in positions])
+        if category is not None:
+            filters.append(self.by_category.get(category, ()))
+        if featured is not None:
+            featured_rows = self.featured
+            if not featured:
+                featured_rows = sorted(set(range(self.size)).difference(featured_rows))
+            filters.append(featured_rows)
+
+        if not filters:
+            if not sort_by:
+                return range(min(limit or self.size, self.size))
+            order = self.orders[sort_by]
+            if ascending:
+                return order[:limit] if limit else order
+            return order[:-limit - 1:-1] if limit else order[::-1]
+
+        # Start from the smallest index and check the others against it
+        filters.sort(key=len)
+        positions = set(filters[0]).intersection(*filters[1:]) if len(filters) > 1 else filters[0]
+        key = self.ranks[sort_by].__getitem__ if sort_by else None
+        if limit:
+            return (nsmallest if ascending or not sort_by else nlargest)(limit, positions, key=key)
+        return sorted(positions, key=key, reverse=bool(sort_by) and not ascending)
+
+    def items(self, positions, fields):
+        """Product dicts holding `fields` for the given rows, raw values as the database returns them"""
+        columns = [(field, self.columns['image_url' if field == 'thumbnail_url' else field]) for field in fields]
+        items = []
+        for pos in positions:
+            item = {field: column[pos] for field, column in columns}
+            if 'featured' in item:
+                item['featured'] = bool(item['featured'])
+            items.append(item)
+        return items
+
+
+class Catalogue:
+    """Optional in-process read model of the catalogue for the product list endpoints.
+
+    The first request starts a background load with `loader()`, which returns
+    every product as a row in COLUMNS order; until it finishes (and whenever
+    the snapshot is off, too large or cannot answer) `snapshot()` returns None
+    and callers query the database. Product change events only record the
+    changed ids (never the items they carry); a background thread re-reads those rows with `loader(ids)` at most
+    every REFRESH_INTERVAL and swaps in a patched copy, so readers never lock
+    and never see a half-applied change. A full reload every
+    CATALOGUE_MAX_AGE picks up writes made outside the app.
+
+    Memory is roughly 40 MB per 100k products, most of it the name,
+    description and image URL strings; CATALOGUE_MAX_PRODUCTS caps it.
+    Each full load first checks `counter()` (a COUNT(*)); over the cap the
+    snapshot is dropped and only the count is checked again, every
+    CATALOGUE_MAX_AGE, until the catalogue fits.
+
+    Config:
+        CATALOGUE_SNAPSHOT: serve product lists from memory (default off)
+        CATALOGUE_MAX_PRODUCTS: larger catalogues are left to the database (default 200000)
+        CATALOGUE_MAX_AGE: seconds between full reloads (default 600)
+    """
+
+    # Changes are folded in at most this often
+    REFRESH_INTERVAL = 1.0
+
+    def __init__(self, loader, counter):
+        self.loader = loader
+        self.counter = counter
+        self.app = None
+        self.enabled = False
+        self.max_products = 200000
+        self.max_age = 600
+        self._snapshot = None
+        self._too_large_at = None  # When the count was last found over max_products
+        self._changed = set()
+        self._deleted = set()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def init_app(self, app):
+        app.config.setdefault('CATALOGUE_SNAPSHOT', os.environ.get('CATALOGUE_SNAPSHOT', '').lower() in ('1', 'true', 'yes'))
+        app.config.setdefault('CATALOGUE_MAX_PRODUCTS', int(os.environ.get('CATALOGUE_MAX_PRODUCTS', 200000)))
+        app.config.setdefault('CATALOGUE_MAX_AGE', int(os.environ.get('CATALOGUE_MAX_AGE', 600)))
+        self.enabled = app.config['CATALOGUE_SNAPSHOT']
+        self.max_products = app.config['CATALOGUE_MAX_PRODUCTS']
+        self.max_age = app.config['CATALOGUE_MAX_AGE']
+        # Loads run on a background thread, outside any request
+        self.app = app
+
+    def snapshot(self):
+        """The current snapshot, or None if lists should come from the database"""
+        if not self.enabled:
+            return None
+        if self._pid != os.getpid():
+            self._start()
+        return self._snapshot
+
+    def _start(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # Nothing loaded before a fork is reused; each worker has its own thread
+            self._pid = os.getpid()
+            self._snapshot = None
+            self._too_large_at = None
+            self._changed.clear()
+            self._deleted.clear()
+        threading.Thread(target=self._run, name='catalogue-refresh', daemon=True).start()
+
+    def apply(self, products=(), deleted=(), ids=()):
+        """Note the changed and deleted ids of a change event; the refresh thread reads the rows.
+
+        Only `ids` is used: every event lists all its changed ids, including
+        products whose item was too large to broadcast.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._changed.update(ids)
+            self._deleted.update(deleted)
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            snapshot = self._snapshot
+            since = snapshot.loaded_at if snapshot is not None else self._too_large_at
+            timeout = self.max_age - (time.monotonic() - since) if since is not None else 0
+            self._wake.wait(max(timeout, 0))
+            self._wake.clear()
+            # Let a burst of changes (e.g. one checkout's lines) arrive together
+            time.sleep(self.REFRESH_INTERVAL)
+            try:
+                with self.app.app_context():
+                    self._refresh()
+            except Exception as e:
+                print(f"Error refreshing catalogue snapshot: {e}")
+                time.sleep(self.REFRESH_INTERVAL)
+
+    def _refresh(self):
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            deleted, self._deleted = self._deleted, set()
+        snapshot = self._snapshot
+        now = time.monotonic()
+        try:
+            if snapshot is None and self._too_large_at is not None and now - self._too_large_at < self.max_age:
+                return  # Too large at the last count; changes don't matter until the next one
+            if snapshot is None or now - snapshot.loaded_at >= self.max_age:
+                count = self.counter()
+                if count > self.max_products:
+                    if self._too_large_at is None:
+                        print(f"Catalogue snapshot off: {count} products is over CATALOGUE_MAX_PRODUCTS ({self.max_products})")
+                    self._snapshot, self._too_large_at = None, now
+                    return
+                self._snapshot, self._too_large_at = CatalogueSnapshot(self.loader()), None
+            elif changed or deleted:
+                rows = self.loader(changed) if changed else []
+                # Changed ids that are gone by now were deleted in the meantime
+                gone = deleted | (changed - {row[0] for row in rows})
+                patched = snapshot.patched(rows, gone)
+                if patched.size > self.max_products:
+                    self._snapshot, self._too_large_at = None, now
+                else:
+                    self._snapshot = patched
+        except Exception:
+            # Put the changes back for the next attempt
+            with self._lock:
+                self._changed |= changed
+                self._deleted |= deleted
+            raise
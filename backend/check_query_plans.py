@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# backend/check_query_plans.py
+"""
+Query plan regression check for the hot query shapes.
+
+Usage:
+    python check_query_plans.py                      # seeded temporary SQLite database
+    python check_query_plans.py --database-url URL   # e.g. a disposable MySQL container
+
+The target database is built with migrate.py and seeded with sample data,
+then every query in HOT_QUERIES, built by the app's own query functions,
+is EXPLAINed. The script prints each plan and exits non-zero if any of
+them falls back to a full table scan (or, for queries that ask for it,
+sorts in a temporary structure instead of reading an index in order).
+Run it in CI after touching models or migrations. Never point it at a
+real database: it inserts seed rows.
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from werkzeug.datastructures import MultiDict
+
+from app import (
+    PRODUCT_FIELDS, Address, Order, Product, Shop, ShopOrder, User, customer_order_history,
+    default_address_query, low_stock_query, order_items, order_shop_line_query, order_status_history_query,
+    owned_shop_query, product_listing, product_reviews_query, related_products_query, shop_order_lines_query,
+    shop_orders_query, shop_orders_since_query, slow_moving_query, top_selling_query, user_addresses_query,
+    user_by_email_query,
+)
+from migrate import migrate
+
+# name -> (statement, checks). Statements come from the same builders app.py
+# runs, so a query that drifts is checked as it now is.
+HOT_QUERIES = {
+    'user_by_email': (user_by_email_query('customer7@example.com'), {}),
+    'shop_by_owner': (owned_shop_query(3), {}),
+    'products_by_shop': (product_listing(MultiDict(), list(PRODUCT_FIELDS), Product.shop_id == 3), {}),
+    'customer_order_history': (customer_order_history(7), {'no_sort': True}),
+    'default_address': (default_address_query(7), {}),
+    'user_addresses': (user_addresses_query(7), {}),
+    'shop_orders_listing': (shop_orders_query(3), {'no_sort': True}),
+    'shop_order_lines': (shop_order_lines_query(3, [40, 41, 42]), {}),
+    'order_shop_line': (order_shop_line_query(42, 3), {}),
+    'order_status_history': (order_status_history_query(42), {'no_sort': True}),
+    'shop_analytics_range': (shop_orders_since_query(3, datetime(2020, 1, 1)), {'no_sort': True}),
+    'low_stock_watchlist': (low_stock_query(3, 10), {'no_sort': True}),
+    'slow_moving_watchlist': (slow_moving_query(3, 10), {'no_sort': True}),
+    'best_sellers': (
+        product_listing(MultiDict({'sortBy': 'sold_count', 'limit': '8'}), list(PRODUCT_FIELDS)),
+        {'no_sort': True},
+    ),
+    'shop_best_sellers': (top_selling_query(3, 10), {'no_sort': True}),
+    'related_products': (related_products_query(5, list(PRODUCT_FIELDS), 10), {'no_sort': True}),
+    'product_reviews_page': (product_reviews_query(5, 21, before=100), {'no_sort': True}),
+}
+
+
+def seed(engine, users=200, shops=20, products_per_shop=25, orders=2000):
+    """Insert enough rows that the planner has a real choice to make"""
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {'id': i, 'name': f"User {i}", 'email': f"customer{i}@example.com", 'password_hash': 'x',
+             'role': 'admin' if i <= shops else 'customer', 'city': 'Hyderabad'}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Shop), [
+            {'id': i, 'name': f"Shop {i}", 'city': 'Hyderabad', 'owner_id': i} for i in range(1, shops + 1)
+        ])
+        product_rows = [
+            {'id': (s - 1) * products_per_shop + j, 'name': f"Product {s}-{j}", 'price': rng.uniform(10, 500),
+             'shop_id': s, 'quantity': rng.randint(0, 200), 'demand_score': rng.uniform(0, 50), 'sold_count': rng.randint(0, 500)}
+            for s in range(1, shops + 1) for j in range(1, products_per_shop + 1)
+        ]
+        conn.execute(insert(Product), product_rows)
+        conn.execute(insert(Address), [
+            {'id': i, 'user_id': i, 'name': 'Home', 'full_name': 'Home', 'street_address': 'Street', 'city': 'Hyderabad',
+             'state': 'TS', 'pincode': '500001', 'postal_code': '500001', 'phone': '1', 'phone_number': '1',
+             'is_default': True, 'created_at': now}
+            for i in range(1, users + 1)
+        ])
+        conn.execute(insert(Order), [
+            {'id': i, 'customer_id': rng.randint(shops + 1, users), 'address_id': None,
+             'created_at': now - timedelta(minutes=i), 'total_amount': 100.0, 'status': 'Pending'}
+            for i in range(1, orders + 1)
+        ])
+        item_rows = []
+        for order_id in range(1, orders + 1):
+            for product in rng.sample(product_rows, 3):
+                item_rows.append({'order_id': order_id, 'product_id': product['id'], 'quantity': 1,
+                                  'shop_id': product['shop_id']})
+        conn.execute(order_items.insert(), item_rows)
+        shop_order_rows = {}
+        for item in item_rows:
+            shop_order_rows.setdefault((item['order_id'], item['shop_id']), {
+                'order_id': item['order_id'], 'shop_id': item['shop_id'], 'customer_id': 1,
+                'created_at': now - timedelta(minutes=item['order_id']), 'subtotal': 100.0, 'item_count': 1,
+            })
+        conn.execute(insert(ShopOrder), list(shop_order_rows.values()))
+        if engine.dialect.name == 'sqlite':
+            conn.execute(text('ANALYZE'))
+
+
+def explain(conn, statement):
+    """Return the plan as a list of human-readable lines"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={'literal_binds': True}))
+    if conn.dialect.name == 'sqlite':
+        return [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+    if conn.dialect.name == 'mysql':
+        rows = conn.execute(text(f"EXPLAIN {sql}")).mappings()
+        return [f"{row['table']} type={row['type']} key={row['key']} extra={row['Extra']}" for row in rows]
+    raise ValueError(f"Unsupported dialect for plan checks: {conn.dialect.name}")
+
+
+def plan_problems(plan, dialect, no_sort=False):
+    """Return the reasons a plan counts as a regression (empty if it is fine)"""
+    problems = []
+    for line in plan:
+        if dialect == 'sqlite':
+            if line.startswith('SCAN ') and 'USING' not in line:
+                problems.append(f"full scan: {line}")
+            if no_sort and 'TEMP B-TREE' in line:
+                problems.append(f"sort: {line}")
+        elif dialect == 'mysql':
+            if ' type=ALL ' in line or ' type=index ' in line:
+                problems.append(f"full scan: {line}")
+            if no_sort and 'filesort' in line:
+                problems.append(f"sort: {line}")
+    return problems
+
+
+def check(engine):
+    """EXPLAIN every hot query. Returns {name: problems} for the ones that regressed"""
+    failures = {}
+    with engine.connect() as conn:
+        for name, (statement, checks) in HOT_QUERIES.items():
+            plan = explain(conn, statement)
+            problems = plan_problems(plan, engine.dialect.name, **checks)
+            print(f"{'FAIL' if problems else 'ok  '} {name}")
+            for line in plan:
+                print(f"       {line}")
+            if problems:
+                failures[name] = problems
+    return failures
+
+
+def main(argv):
+    tmp_path = None
+    if '--database-url' in argv:
+        url = argv[argv.index('--database-url') + 1]
+    else:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = f"sqlite:///{tmp_path}"
+
+    engine = create_engine(url)
+    try:
+        migrate(engine)
+        seed(engine)
+        failures = check(engine)
+    finally:
+        engine.dispose()
+        if tmp_path:
+            os.remove(tmp_path)
+
+    if failures:
+        print(f"\n{len(failures)} hot queries regressed to full scans or sorts:")
+        for name, problems in failures.items():
+            for problem in problems:
+                print(f"  {name}: {problem}")
+        sys.exit(1)
+    print(f"\nAll {len(HOT_QUERIES)} hot query plans use indexes.")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,89 @@
+# backend/compression.py
+import gzip
+import os
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional: without it only gzip is offered
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header, skipping any with q=0"""
+    encodings = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class Compressor:
+    """Compress large JSON/text responses with brotli or gzip, as the client accepts.
+
+    Streamed responses (SSE), responses that already have a Content-Encoding
+    and bodies under COMPRESS_MIN_BYTES are sent as they are.
+
+    Config:
+        COMPRESS_MIN_BYTES: smallest body worth compressing (default 1024)
+        COMPRESS_LEVEL: gzip level, 1-9 (default 6)
+        COMPRESS_BROTLI_QUALITY: brotli quality, 0-11 (default 4; higher costs much more CPU)
+    """
+
+    def __init__(self, app=None):
+        self.min_bytes = 1024
+        self.level = 6
+        self.brotli_quality = 4
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_MIN_BYTES', int(os.environ.get('COMPRESS_MIN_BYTES', 1024)))
+        app.config.setdefault('COMPRESS_LEVEL', 6)
+        app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+        self.min_bytes = app.config['COMPRESS_MIN_BYTES']
+        self.level = app.config['COMPRESS_LEVEL']
+        self.brotli_quality = app.config['COMPRESS_BROTLI_QUALITY']
+        app.after_request(self.compress)
+
+    def choose_encoding(self, accept_encoding):
+        encodings = accepted_encodings(accept_encoding)
+        if brotli is not None and 'br' in encodings:
+            return 'br'
+        if 'gzip' in encodings:
+            return 'gzip'
+        return None
+
+    def compress(self, response):
+        if (response.is_streamed or response.direct_passthrough
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        # Compressed or not, the body now depends on Accept-Encoding
+        response.vary.add('Accept-Encoding')
+
+        encoding = self.choose_encoding(request.headers.get('Accept-Encoding'))
+        if encoding is None or request.method == 'HEAD':
+            return response
+        data = response.get_data()
+        if len(data) < self.min_bytes:
+            return response
+
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(data, compresslevel=self.level, mtime=0)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # The bytes differ per encoding, so a strong validator no longer fits
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
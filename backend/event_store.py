@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# backend/event_store.py
+"""
+Append-only, day-partitioned store for client telemetry events.
+
+Layout:
+    <root>/<YYYY-MM-DD>/part-<pid>.evb   blocks appended by each worker process
+    <root>/<YYYY-MM-DD>/compacted.evb    written by `compact` once the day is over
+
+A file is a sequence of blocks. Each block holds one ingested batch in
+columnar form (timestamps, dictionary-encoded name/user/session columns,
+shop ids and JSON properties), zlib-compressed behind a small header.
+Writers append whole blocks with a single write() on an O_APPEND file, so
+concurrent workers never interleave; a torn block at the end of a file
+(after a crash) is skipped by readers.
+
+Usage:
+    python event_store.py compact [--root DIR]   # merge closed days into one file each
+"""
+
+import heapq
+import json
+import math
+import os
+import shutil
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from datetime import datetime
+
+MAGIC = b'EVB1'
+HEADER = struct.Struct('<4sII')  # magic, row count, compressed payload length
+LENGTH = struct.Struct('<I')
+
+# Cheap validation limits for one ingested event
+MAX_NAME_LENGTH = 64
+MAX_ID_LENGTH = 128
+MAX_PROPERTIES_BYTES = 4096
+
+# Batch limits for the ingestion endpoint
+MAX_BATCH_EVENTS = 1000
+MAX_DECOMPRESSED_BYTES = 5 * 1024 * 1024
+
+# Rows per block when compacting; larger blocks compress better
+COMPACT_BLOCK_ROWS = 50000
+# Rows sorted in memory at once by `compact`; bigger days are merged from sorted runs
+COMPACT_RUN_ROWS = 500000
+# Rows per block in those runs, so the merge holds only one small block per run
+RUN_BLOCK_ROWS = 5000
+
+# Column ranges: timestamps are int64 milliseconds, shop ids int32
+MAX_TIMESTAMP = 2 ** 63 - 1
+SHOP_ID_RANGE = (-2 ** 31, 2 ** 31 - 1)
+
+COLUMNS = ('timestamp', 'name', 'user_id', 'session_id', 'shop_id', 'properties')
+
+
+class InvalidEvent(ValueError):
+    pass
+
+
+def validate_event(event):
+    """Check one client event and return it as a row tuple in COLUMNS order"""
+    if not isinstance(event, dict):
+        raise InvalidEvent("Event must be an object")
+    name = event.get('name')
+    if not isinstance(name, str) or not name or len(name) > MAX_NAME_LENGTH:
+        raise InvalidEvent("Invalid event name")
+    timestamp = event.get('timestamp')
+    if not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool):
+        raise InvalidEvent("Invalid event timestamp")
+    if not math.isfinite(timestamp) or not 0 < timestamp <= MAX_TIMESTAMP:
+        raise InvalidEvent("Invalid event timestamp")
+
+    user_id = event.get('userId') or ''
+    session_id = event.get('sessionId') or ''
+    if not isinstance(user_id, (str, int)) or not isinstance(session_id, str):
+        raise InvalidEvent("Invalid user or session id")
+    user_id = str(user_id)
+    if len(user_id) > MAX_ID_LENGTH or len(session_id) > MAX_ID_LENGTH:
+        raise InvalidEvent("Invalid user or session id")
+
+    properties = event.get('properties') or {}
+    if not isinstance(properties, dict):
+        raise InvalidEvent("Invalid event properties")
+    shop_id = properties.get('shop_id')
+    shop_id = shop_id if isinstance(shop_id, int) and not isinstance(shop_id, bool) else -1
+    if not SHOP_ID_RANGE[0] <= shop_id <= SHOP_ID_RANGE[1]:
+        raise InvalidEvent("Invalid shop id")
+    encoded = json.dumps(properties, separators=(',', ':'), default=str)
+    if len(encoded) > MAX_PROPERTIES_BYTES:
+        raise InvalidEvent("Event properties too large")
+
+    return int(timestamp), name, user_id, session_id, shop_id, encoded
+
+
+def parse_batch(body, content_encoding=None):
+    """Decode a (possibly gzip-compressed) JSON batch into a list of raw events"""
+    if (content_encoding or '').lower() == 'gzip':
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            body = decompressor.decompress(body, MAX_DECOMPRESSED_BYTES)
+        except zlib.error:
+            raise InvalidEvent("Invalid gzip body")
+        if decompressor.unconsumed_tail:
+            raise InvalidEvent("Batch too large")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise InvalidEvent("Invalid JSON body")
+    events = payload.get('events') if isinstance(payload, dict) else payload
+    if not isinstance(events, list):
+        raise InvalidEvent("Expected a list of events")
+    if len(events) > MAX_BATCH_EVENTS:
+        raise InvalidEvent(f"At most {MAX_BATCH_EVENTS} events per batch")
+    return events
+
+
+# --- Block encoding ---
+
+def _pack_bytes(data):
+    return LENGTH.pack(len(data)) + data
+
+
+def _pack_strings(values):
+    return _pack_bytes(json.dumps(values, separators=(',', ':')).encode())
+
+
+def _pack_dictionary(values):
+    """Dictionary-encode a string column: distinct values + uint32 codes"""
+    codes = {}
+    indexes = array('I', (codes.setdefault(v, len(codes)) for v in values))
+    return _pack_strings(list(codes)) + _pack_bytes(indexes.tobytes())
+
+
+def encode_block(rows):
+    timestamps, names, users, sessions, shops, properties = zip(*rows)
+    payload = b''.join([
+        _pack_bytes(array('q', timestamps).tobytes()),
+        _pack_dictionary(names),
+        _pack_dictionary(users),
+        _pack_dictionary(sessions),
+        _pack_bytes(array('i', shops).tobytes()),
+        _pack_strings(list(properties)),
+    ])
+    compressed = zlib.compress(payload, 6)
+    return HEADER.pack(MAGIC, len(rows), len(compressed)) + compressed
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def bytes(self):
+        (length,) = LENGTH.unpack_from(self.data, self.offset)
+        start = self.offset + LENGTH.size
+        self.offset = start + length
+        return self.data[start:self.offset]
+
+    def array(self, typecode):
+        values = array(typecode)
+        values.frombytes(self.bytes())
+        return values
+
+    def strings(self):
+        return json.loads(self.bytes())
+
+    def dictionary(self):
+        values = self.strings()
+        return [values[i] for i in self.array('I')]
+
+
+def decode_block(payload, columns=COLUMNS):
+    """Decode a compressed block into {column: list}. Unrequested columns are skipped"""
+    reader = _Reader(zlib.decompress(payload))
+    decoded = {
+        'timestamp': reader.array('q'),
+        'name': reader.dictionary(),
+        'user_id': reader.dictionary(),
+        'session_id': reader.dictionary(),
+        'shop_id': reader.array('i'),
+    }
+    if 'properties' in columns:
+        decoded['properties'] = reader.strings()
+    return {column: decoded[column] for column in columns}
+
+
+def read_file(path, columns=COLUMNS):
+    """Yield decoded blocks from one file, stopping at a torn trailing block"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            magic, count, length = HEADER.unpack(header)
+            payload = f.read(length) if magic == MAGIC else b''
+            if magic != MAGIC or len(payload) < length:
+                break
+            yield decode_block(payload, columns)
+
+
+def read_rows(path):
+    """Yield the rows of one file in COLUMNS order, one block in memory at a time"""
+    for block in read_file(path):
+        yield from zip(*(block[c] for c in COLUMNS))
+
+
+def write_blocks(path, rows, block_rows):
+    """Write an iterable of rows to a new file as blocks of `block_rows`; returns the row count"""
+    count = 0
+    with open(path, 'wb') as f:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == block_rows:
+                f.write(encode_block(chunk))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            f.write(encode_block(chunk))
+            count += len(chunk)
+    return count
+
+
+class EventStore:
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def partition(self, day):
+        return os.path.join(self.root, day.isoformat())
+
+    def append(self, rows, now=None):
+        """Append validated rows as one block to today's partition"""
+        if not rows:
+            return
+        day = (now or datetime.utcnow()).date()
+        directory = self.partition(day)
+        os.makedirs(directory, exist_ok=True)
+        block = encode_block(rows)
+        path = os.path.join(directory, f"part-{os.getpid()}.evb")
+        with self._lock:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, block)
+            finally:
+                os.close(fd)
+
+    def days(self):
+        result = []
+        for name in sorted(os.listdir(self.root)):
+            try:
+                result.append(datetime.strptime(name, '%Y-%m-%d').date())
+            except ValueError:
+                continue
+        return result
+
+    def files(self, day):
+        directory = self.partition(day)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.endswith('.evb'))
+
+    def scan(self, start_day, end_day, columns=COLUMNS):
+        """Yield (day, block) for every block in [start_day, end_day]"""
+        for day in self.days():
+            if start_day <= day <= end_day:
+                for path in self.files(day):
+                    for block in read_file(path, columns):
+                        yield day, block
+
+    def compact(self, day):
+        """Merge a closed day's part files into compacted.evb, sorted by timestamp.
+
+        Rows are sorted COMPACT_RUN_ROWS at a time into run files, which are
+        then merged one small block per run, so memory stays bounded however
+        large the day is.
+        """
+        paths = self.files(day)
+        if not paths or (len(paths) == 1 and paths[0].endswith('compacted.evb')):
+            return 0
+        target = os.path.join(self.partition(day), 'compacted.evb')
+        tmp_path = f"{target}.tmp"
+        runs_dir = f"{target}.runs"
+        shutil.rmtree(runs_dir, ignore_errors=True)
+        by_time = lambda row: row[0]
+        try:
+            runs, run = [], []
+            for path in paths:
+                for row in read_rows(path):
+                    run.append(row)
+                    if len(run) == COMPACT_RUN_ROWS:
+                        os.makedirs(runs_dir, exist_ok=True)
+                        run.sort(key=by_time)
+                        runs.append(os.path.join(runs_dir, f"run-{len(runs)}.evb"))
+                        write_blocks(runs[-1], run, RUN_BLOCK_ROWS)
+                        run = []
+            run.sort(key=by_time)
+            # heapq.merge is stable, and runs are merged in file order
+            merged = heapq.merge(*(read_rows(path) for path in runs), run, key=by_time) if runs else run
+            count = write_blocks(tmp_path, merged, COMPACT_BLOCK_ROWS)
+        finally:
+            shutil.rmtree(runs_dir, ignore_errors=True)
+        os.replace(tmp_path, target)
+        for path in paths:
+            if path != target:
+                os.remove(path)
+        return count
+
+    def compact_closed_days(self, today=None):
+        """Compact every partition older than today. Returns {day: rows}"""
+        today = today or datetime.utcnow().date()
+        return {day: self.compact(day) for day in self.days() if day < today}
+
+
+def default_root():
+    return os.environ.get('EVENT_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events'))
+
+
+def main(argv):
+    if not argv or argv[0] != 'compact':
+        print(__doc__)
+        sys.exit(1)
+    root = argv[argv.index('--root') + 1] if '--root' in argv else default_root()
+    store = EventStore(root)
+    for day, count in store.compact_closed_days().items():
+        print(f"{day}: {count} events compacted")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
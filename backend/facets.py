@@ -0,0 +1,83 @@
+# backend/facets.py
+from bisect import bisect_right
+
+from snapshots import ScopedSnapshots
+
+# Lower bounds of the histogram buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 50, 100, 200, 500, 1000)
+DISCOUNT_BUCKETS = (0, 10, 25, 50)
+
+
+def histogram(values, bounds):
+    counts = [0] * len(bounds)
+    for value in values:
+        counts[max(bisect_right(bounds, value or 0) - 1, 0)] += 1
+    return [
+        {'min': low, 'max': bounds[i + 1] if i + 1 < len(bounds) else None, 'count': counts[i]}
+        for i, low in enumerate(bounds)
+    ]
+
+
+class FacetSnapshots(ScopedSnapshots):
+    """Filter facets (category and unit counts, price and discount histograms) per city or shop.
+
+    The first request for a scope loads one small row per product with
+    `loader(kind, value)`, and product change events keep it current (see
+    ScopedSnapshots). Only a product's facet values are kept, so checkouts
+    that only move stock or sales counters keep the cached body and its
+    ETag. A scope is ('city', name) with the same substring match as
+    /api/products/city/<city>, or ('shop', id).
+
+    Config:
+        FACET_MAX_AGE: seconds before a scope is reloaded from the database (default 600)
+    """
+
+    MAX_AGE_CONFIG = 'FACET_MAX_AGE'
+    MAX_SCOPES = 1024
+    NAME = 'facets'
+
+    @staticmethod
+    def key(kind, value):
+        return (kind, value.strip().lower() if kind == 'city' else value)
+
+    def facets(self, kind, value):
+        """(JSON body, ETag) for a city or shop"""
+        return self.get(self.key(kind, value))
+
+    def read(self, key):
+        return self.loader(*key)
+
+    def index(self, rows):
+        # product id -> (shop_id, city, category, unit, price, discount_percentage)
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    def matches(self, key, product):
+        kind, value = key
+        if kind == 'city':
+            return value in (product['city'] or '').lower()
+        return product['shop_id'] == value
+
+    def item(self, product):
+        return (product['shop_id'], product['city'], product['category'], product['unit'],
+                product['price'], product['discount_percentage'])
+
+    def render(self, key, products):
+        products = list(products)
+        categories, units = {}, {}
+        for _, _, category, unit, price, _ in products:
+            low, high, count = categories.get(category, (price, price, 0))
+            categories[category] = (min(low, price), max(high, price), count + 1)
+            units[unit] = units.get(unit, 0) + 1
+        prices = [p[4] for p in products]
+        return {
+            key[0]: key[1],
+            'total': len(products),
+            'categories': [
+                {'name': name, 'count': count, 'minPrice': low, 'maxPrice': high}
+                for name, (low, high, count) in sorted(categories.items())
+            ],
+            'units': [{'name': name, 'count': count} for name, count in sorted(units.items())],
+            'priceRange': {'min': min(prices), 'max': max(prices)} if prices else None,
+            'priceBuckets': histogram(prices, PRICE_BUCKETS),
+            'discountBuckets': histogram((p[5] for p in products), DISCOUNT_BUCKETS),
+        }
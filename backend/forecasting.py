@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# backend/forecasting.py
+"""
+Per-product demand forecasts and reorder suggestions.
+
+Daily units sold per product are loaded in one grouped query and laid out as
+a products x days matrix. Every model runs on the whole matrix at once:
+
+- moving_average: mean of the last MA_WINDOW days
+- exponential_smoothing: exponentially weighted level (SES_ALPHA)
+- seasonal_naive: repeat the last week
+
+Each product gets the model with the lowest error on a one-week holdout,
+and the spread of that model's holdout errors sets its safety stock.
+Forecasts go into the product_forecasts table. Reorder quantities are
+worked out at read time against live stock.
+
+Usage:
+    python forecasting.py recompute   # refresh all forecasts (e.g. nightly from cron)
+"""
+
+import importlib.util
+import math
+import sys
+import threading
+from datetime import datetime, timedelta
+
+# numpy is optional (without it forecasts are never computed) and is only
+# imported when a forecast actually runs, which keeps app startup fast
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+MODELS = ('moving_average', 'exponential_smoothing', 'seasonal_naive')
+
+SEASON_DAYS = 7
+HISTORY_DAYS = 8 * SEASON_DAYS
+HORIZON_DAYS = 14  # Supplier lead time plus review period
+MA_WINDOW = 14
+SES_ALPHA = 0.3
+SERVICE_LEVEL_Z = 1.65  # ~95% chance of not running out within the horizon
+
+
+def demand_matrix(product_index, day_offsets, quantities, n_products, n_days):
+    """Scatter (product row, day offset, units) triples into a products x days matrix"""
+    import numpy as np
+    history = np.zeros((n_products, n_days))
+    np.add.at(history, (product_index, day_offsets), quantities)
+    return history
+
+
+def model_forecasts(history, horizon):
+    """Daily forecasts from every model: array of shape (len(MODELS), products, horizon)"""
+    import numpy as np
+    n_products, n_days = history.shape
+    window = min(MA_WINDOW, n_days)
+    moving_average = history[:, -window:].mean(axis=1)
+
+    # Exponential smoothing as a dot product with normalised decay weights (oldest first)
+    weights = SES_ALPHA * (1 - SES_ALPHA) ** np.arange(n_days)[::-1]
+    smoothed = history @ (weights / weights.sum())
+
+    season = min(SEASON_DAYS, n_days)
+    repeats = -(-horizon // season)
+    seasonal = np.tile(history[:, -season:], repeats)[:, :horizon]
+
+    return np.stack([
+        np.repeat(moving_average[:, None], horizon, axis=1),
+        np.repeat(smoothed[:, None], horizon, axis=1),
+        seasonal,
+    ])
+
+
+def forecast(history, horizon=HORIZON_DAYS):
+    """Pick a model per product by holdout error and forecast `horizon` days.
+
+    Returns (model index per product, total demand over the horizon, safety stock).
+    """
+    import numpy as np
+    holdout = SEASON_DAYS
+    if history.shape[1] < 2 * holdout:
+        raise ValueError(f"Need at least {2 * holdout} days of history")
+
+    backtest = model_forecasts(history[:, :-holdout], holdout)
+    errors = backtest - history[None, :, -holdout:]
+    best = np.abs(errors).mean(axis=2).argmin(axis=0)
+    products = np.arange(history.shape[0])
+
+    daily = model_forecasts(history, horizon)[best, products]
+    sigma = errors[best, products].std(axis=1)
+    return best, daily.sum(axis=1), SERVICE_LEVEL_Z * sigma * math.sqrt(horizon)
+
+
+def reorder_quantity(horizon_demand, safety_stock, quantity):
+    """Units to order now to cover forecast demand plus safety stock"""
+    return max(0, math.ceil(horizon_demand + safety_stock - quantity))
+
+
+def recompute(history_days=HISTORY_DAYS, horizon=HORIZON_DAYS, batch_size=5000):
+    """Rebuild product_forecasts for every product from recent order history. Needs an app context."""
+    if not HAS_NUMPY:
+        raise RuntimeError("Demand forecasting requires numpy")
+    import numpy as np
+    from app import db, order_items, Order, Product, ProductForecast
+
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=history_days - 1)
+    products = db.session.query(Product.id, Product.shop_id).order_by(Product.id).all()
+    if not products:
+        return 0
+    product_ids = np.array([p[0] for p in products])
+    shop_ids = [p[1] for p in products]
+
+    day = db.func.date(Order.created_at)
+    rows = db.session.query(order_items.c.product_id, day, db.func.sum(order_items.c.quantity)).\
+        join(Order, Order.id == order_items.c.order_id).\
+        filter(Order.created_at >= datetime.combine(start, datetime.min.time()), Order.status != 'Cancelled').\
+        group_by(order_items.c.product_id, day).all()
+
+    history = np.zeros((len(products), history_days))
+    if rows:
+        ids, days, quantities = zip(*rows)
+        ids = np.array(ids)
+        # SQLite returns 'YYYY-MM-DD' strings, MySQL returns dates; numpy parses both
+        offsets = (np.array([str(d) for d in days], dtype='datetime64[D]') - np.datetime64(start)).astype(int)
+        index = np.searchsorted(product_ids, ids)
+        known = (index < len(product_ids)) & (product_ids[np.minimum(index, len(product_ids) - 1)] == ids)
+        history = demand_matrix(index[known], offsets[known], np.array(quantities, dtype=float)[known],
+                                len(products), history_days)
+
+    best, demand, safety = forecast(history, horizon)
+    now = datetime.utcnow()
+    records = [
+        {'product_id': int(pid), 'shop_id': shop_id, 'model': MODELS[m], 'daily_demand': float(d) / horizon,
+         'horizon_demand': float(d), 'safety_stock': float(s), 'computed_at': now}
+        for pid, shop_id, m, d, s in zip(product_ids, shop_ids, best, demand, safety)
+    ]
+    db.session.query(ProductForecast).delete(synchronize_session=False)
+    for i in range(0, len(records), batch_size):
+        db.session.execute(db.insert(ProductForecast), records[i:i + batch_size])
+    db.session.commit()
+    return len(records)
+
+
+class BackgroundRefresh:
+    """Run a job in a daemon thread on demand, at most one run at a time per process"""
+
+    def __init__(self, job):
+        self.job = job
+        self.app = None
+        self._running = threading.Lock()
+
+    def init_app(self, app):
+        # The job runs in the app context, on its own thread
+        self.app = app
+
+    def trigger(self):
+        if not HAS_NUMPY or not self._running.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._run, name='forecast-refresh', daemon=True).start()
+        return True
+
+    def _run(self):
+        try:
+            with self.app.app_context():
+                self.job()
+        except Exception as e:
+            print(f"Error recomputing forecasts: {e}")
+        finally:
+            self._running.release()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['recompute']:
+        print(__doc__)
+        sys.exit(1)
+    from app import create_app
+    with create_app().app_context():
+        print(f"Recomputed forecasts for {recompute()} products")
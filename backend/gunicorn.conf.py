@@ -0,0 +1,31 @@
+# backend/gunicorn.conf.py
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# gthread workers hold one thread per open request, and a live dashboard or
+# order stream (SSE, long-poll) keeps its thread for as long as the client
+# stays. Size each worker for the REALTIME_MAX_CONNECTIONS streams the app
+# admits (see realtime.Hub) plus GUNICORN_THREADS for ordinary requests, so
+# open streams never starve the API. Streams release their DB connection
+# while they wait, so the pool does not need to grow with them.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) + int(os.environ.get('REALTIME_MAX_CONNECTIONS', 200))
+timeout = 60
+
+# In-memory dashboards, home sections and catalogue/facet snapshots are kept
+# per worker and patched by broadcast events (see realtime.Broadcaster)
+if workers > 1 and os.environ.get('REALTIME_BROADCAST_DIR', '').lower() == 'off':
+    raise SystemExit("REALTIME_BROADCAST_DIR=off only works with a single worker; set WEB_CONCURRENCY=1 or leave it empty")
+
+# Import the app once in the master and fork workers from it: faster worker
+# boots and shared memory pages. wsgi.py disposes DB engines in each child.
+preload_app = True
+
+
+def worker_exit(server, worker):
+    # Fold the exiting worker's analytics sketch deltas into the shared file
+    worker.wsgi.extensions['sketch_store'].flush()
@@ -0,0 +1,54 @@
+# backend/home.py
+import heapq
+from datetime import datetime
+
+from snapshots import ScopedSnapshots
+
+SECTION_SIZE = 8
+
+
+class HomeSnapshots(ScopedSnapshots):
+    """Home screen sections per city, built in memory.
+
+    The first request for a city loads that city's product list items with
+    `loader(city)`, and product change events keep them current (see
+    ScopedSnapshots). A city matches the same shops as
+    /api/products/city/<city> (case-insensitive substring; '' is every
+    city).
+
+    Config:
+        HOME_SNAPSHOT_MAX_AGE: seconds before a city is reloaded from the database (default 600)
+    """
+
+    MAX_AGE_CONFIG = 'HOME_SNAPSHOT_MAX_AGE'
+    MAX_SCOPES = 256
+    NAME = 'home snapshot'
+
+    @staticmethod
+    def key(city):
+        return (city or '').strip().lower()
+
+    def bundle(self, city):
+        """(JSON body, ETag) for a city's home screen"""
+        return self.get(self.key(city))
+
+    def index(self, products):
+        return {p['id']: p for p in products}
+
+    def matches(self, key, product):
+        return key in (product['city'] or '').lower()
+
+    def render(self, key, products):
+        products = list(products)
+        featured = [p for p in products if p['featured']]
+        categories = {}
+        for p in products:
+            categories[p['category']] = categories.get(p['category'], 0) + 1
+        return {
+            'city': key,
+            'featured': heapq.nlargest(SECTION_SIZE, featured, key=lambda p: (p['sold_count'], p['id'])),
+            'newArrivals': heapq.nlargest(SECTION_SIZE, products, key=lambda p: p['id']),
+            'bestSellers': heapq.nlargest(SECTION_SIZE, products, key=lambda p: (p['sold_count'], p['id'])),
+            'categories': [{'name': name, 'count': count} for name, count in sorted(categories.items())],
+            'generatedAt': datetime.utcnow().isoformat(),
+        }
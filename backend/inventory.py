@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# backend/inventory.py
+"""
+Sales velocity and stock watchlist helpers.
+
+Each product keeps a `demand_score`: every unit sold adds
+exp((sold_at - DEMAND_EPOCH) / DEMAND_TAU_DAYS). The score never needs to be
+decayed in place. Decaying it to "now" multiplies every product by the same
+factor, so ordering by the raw score is already ordering by current sales
+velocity, and (shop_id, demand_score) can be an ordinary index. Sales and
+cancellations are plain atomic `demand_score = demand_score +/- x` updates.
+
+`sold_count` is kept the same way, with increments on checkout and
+decrements on cancellation; `reconcile` repairs any drift from order history.
+
+Usage:
+    python inventory.py rebuild     # recompute demand scores from order history
+    python inventory.py reconcile   # recompute sold_count from order history
+"""
+
+import math
+import sys
+from datetime import datetime
+
+# Reference point for scores. Scores grow by e every DEMAND_TAU_DAYS, so an
+# 8-byte double (max ~1.8e308, e^709) lasts 709 * 14 days, about 27 years,
+# until roughly 2052; a 4-byte FLOAT column would overflow in mid-2028.
+# Before then, move the epoch forward and run `rebuild` (or multiply every
+# score by exp(-shift_days / DEMAND_TAU_DAYS) in one UPDATE).
+DEMAND_EPOCH = datetime(2025, 1, 1)
+DEMAND_TAU_DAYS = 14.0
+
+LOW_STOCK_THRESHOLD = 10
+
+
+def _days_since_epoch(when):
+    return (when - DEMAND_EPOCH).total_seconds() / 86400
+
+
+def demand_increment(quantity, when):
+    """Score contribution of `quantity` units sold at `when`"""
+    return quantity * math.exp(_days_since_epoch(when) / DEMAND_TAU_DAYS)
+
+
+def daily_rate(score, now=None):
+    """Exponentially weighted units sold per day, as of `now`"""
+    now = now or datetime.utcnow()
+    return (score or 0) * math.exp(-_days_since_epoch(now) / DEMAND_TAU_DAYS) / DEMAND_TAU_DAYS
+
+
+def days_of_cover(quantity, rate):
+    """Days until stock runs out at the current rate (None if nothing is selling)"""
+    if rate <= 1e-9:
+        return None
+    return round(quantity / rate, 1)
+
+
+def crossed_low_stock(before, after, threshold=LOW_STOCK_THRESHOLD):
+    return before > threshold >= after
+
+
+def rebuild(batch_size=5000):
+    """Recompute every product's demand_score from non-cancelled orders. Needs an app context."""
+    from app import db, order_history_tables, Product
+
+    scores = {}
+    for orders, lines in order_history_tables():
+        rows = db.session.query(lines.c.product_id, lines.c.quantity, orders.c.created_at).\
+            join(orders, orders.c.id == lines.c.order_id).\
+            filter(orders.c.status != 'Cancelled').\
+            yield_per(batch_size)
+        for product_id, quantity, created_at in rows:
+            scores[product_id] = scores.get(product_id, 0) + demand_increment(quantity, created_at)
+
+    db.session.query(Product).update({Product.demand_score: 0}, synchronize_session=False)
+    items = list(scores.items())
+    for i in range(0, len(items), batch_size):
+        db.session.execute(
+            Product.__table__.update().where(Product.id == db.bindparam('pid')).values(demand_score=db.bindparam('score')),
+            [{'pid': pid, 'score': score} for pid, score in items[i:i + batch_size]]
+        )
+        db.session.commit()
+    db.session.commit()
+    print(f"Rebuilt demand scores for {len(scores)} products")
+
+
+def reconcile_sold_counts(batch_size=1000):
+    """Recompute sold_count from non-cancelled orders, one chunk of product ids at a time.
+
+    Each chunk reads the stored counts and the order totals in one statement,
+    so both come from the same snapshot, and drifted rows are corrected with
+    `sold_count = sold_count + (computed - read)`. Checkouts and cancellations
+    that commit in between keep their own increments, so this can run
+    against a live database; each chunk is its own short transaction.
+    """
+    from app import db, order_history_tables, Product
+
+    computed = 0
+    for orders, lines in order_history_tables():
+        computed += db.select(db.func.coalesce(db.func.sum(lines.c.quantity), 0)).\
+            select_from(lines).join(orders, orders.c.id == lines.c.order_id).\
+            where(lines.c.product_id == Product.id, orders.c.status != 'Cancelled').\
+            scalar_subquery()
+
+    fixed = 0
+    last_id = 0
+    while True:
+        chunk = db.session.query(Product.id, Product.sold_count, computed).filter(Product.id > last_id).\
+            order_by(Product.id).limit(batch_size).all()
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+        drifted = [{'pid': pid, 'delta': int(total) - sold} for pid, sold, total in chunk if sold != int(total)]
+        if drifted:
+            db.session.execute(
+                Product.__table__.update().where(Product.id == db.bindparam('pid')).
+                values(sold_count=Product.sold_count + db.bindparam('delta')),
+                drifted
+            )
+        db.session.commit()
+        fixed += len(drifted)
+    print(f"Reconciled sold_count: {fixed} products corrected")
+
+COMMANDS = {
+    'rebuild': rebuild,
+    'reconcile': reconcile_sold_counts,
+}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        print(__doc__)
+        sys.exit(1)
+    from app import create_app
+    with create_app().app_context():
+        COMMANDS[sys.argv[1]]()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# backend/migrate.py
+"""
+Versioned schema migrations.
+
+Usage:
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied/pending migrations
+    python migrate.py --sql      # print the SQL pending migrations would run
+
+Every migration is idempotent (it checks the live schema before changing it)
+and is recorded in the schema_migrations table once applied, so running this
+repeatedly is safe. Run it before starting the app: the server no longer
+creates tables on boot.
+"""
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.schema import CreateTable
+
+from app import create_app, db
+
+VERSION_TABLE = 'schema_migrations'
+
+version_table = Table(
+    VERSION_TABLE, MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class Operations:
+    """Schema helpers handed to each migration.
+
+    In dry-run mode statements are collected instead of executed, so
+    `--sql` shows exactly what a real run would do against this database.
+    """
+
+    def __init__(self, conn, dry_run=False):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+        self.dry_run = dry_run
+        self.statements = []
+
+    def execute(self, sql):
+        self.statements.append(sql)
+        if not self.dry_run:
+            self.conn.execute(text(sql))
+
+    def inspector(self):
+        # Fresh inspector each time so checks see changes made earlier in the run
+        return inspect(self.conn)
+
+    def table_exists(self, table):
+        return self.inspector().has_table(table)
+
+    def column_exists(self, table, column):
+        if not self.table_exists(table):  # Only possible in a dry run on an empty database
+            return False
+        return column in {c['name'] for c in self.inspector().get_columns(table)}
+
+    def index_exists(self, table, index):
+        if not self.table_exists(table):
+            return False
+        return index in {i['name'] for i in self.inspector().get_indexes(table)}
+
+    def create_tables(self, *tables):
+        for table in tables:
+            if not self.table_exists(table.name):
+                self.statements.append(str(CreateTable(table).compile(dialect=self.conn.dialect)).strip())
+                if not self.dry_run:
+                    table.create(self.conn)
+
+    def add_column(self, table, column, ddl):
+        if not self.column_exists(table, column):
+            self.execute(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+    def drop_index(self, table, index):
+        if not self.index_exists(table, index):
+            return
+        if self.dialect == 'mysql':
+            self.execute(f"DROP INDEX {index} ON {table} ALGORITHM=INPLACE LOCK=NONE")
+        else:
+            self.execute(f"DROP INDEX {index}")
+
+    def create_index(self, table, index, columns, unique=False):
+        """Create an index without blocking writes where the database allows it"""
+        if self.index_exists(table, index):
+            return
+        cols = ', '.join(columns)
+        create = 'CREATE UNIQUE INDEX' if unique else 'CREATE INDEX'
+        if self.dialect == 'mysql':
+            # InnoDB builds the index in place while reads and writes continue
+            self.execute(f"{create} {index} ON {table} ({cols}) ALGORITHM=INPLACE LOCK=NONE")
+        else:
+            self.execute(f"{create} {index} ON {table} ({cols})")
+
+
+# --- Migrations ---
+# Append new migrations to the end of MIGRATIONS; never renumber applied ones.
+
+def initial_schema(ops):
+    """Core tables as they existed before migrations were versioned"""
+    metadata = db.metadata
+    ops.create_tables(*[metadata.tables[name] for name in ('users', 'shops', 'products', 'addresses', 'orders', 'order_items')])
+
+
+def product_catalogue_columns(ops):
+    """Catalogue fields added to products after launch (was update_schema.py)"""
+    ops.add_column('products', 'category', "VARCHAR(50) NOT NULL DEFAULT 'Vegetables'")
+    ops.add_column('products', 'discount_percentage', 'FLOAT NOT NULL DEFAULT 0')
+    ops.add_column('products', 'featured', 'BOOLEAN NOT NULL DEFAULT FALSE')
+    ops.add_column('products', 'unit', "VARCHAR(20) NOT NULL DEFAULT 'kg'")
+    ops.add_column('products', 'description', 'TEXT')
+    ops.add_column('products', 'sold_count', 'INTEGER NOT NULL DEFAULT 0')
+    ops.add_column('products', 'quantity', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def address_columns(ops):
+    """Structured address fields next to the legacy ones (was update_db.py)"""
+    ops.add_column('addresses', 'full_name', "VARCHAR(100) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'street_address', "VARCHAR(255) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'landmark', 'VARCHAR(100)')
+    ops.add_column('addresses', 'city', "VARCHAR(100) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'state', "VARCHAR(100) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'postal_code', "VARCHAR(20) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'phone_number', "VARCHAR(20) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'is_default', 'BOOLEAN DEFAULT FALSE')
+    ops.add_column('addresses', 'created_at', 'DATETIME')
+    # Legacy columns still written by the API
+    ops.add_column('addresses', 'name', "VARCHAR(100) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'pincode', "VARCHAR(20) NOT NULL DEFAULT ''")
+    ops.add_column('addresses', 'phone', "VARCHAR(20) NOT NULL DEFAULT ''")
+
+
+def order_payment_columns(ops):
+    """Delivery address and payment details on orders (was migrate_db.py)"""
+    ops.add_column('orders', 'address_id', 'INTEGER')
+    ops.add_column('orders', 'payment_method', 'VARCHAR(50)')
+    ops.add_column('orders', 'payment_transaction_id', 'VARCHAR(100)')
+
+
+def cart_table(ops):
+    """Server-side cart (was add_cart_table.py, which targeted a stray SQLite file)"""
+    cart = Table(
+        'cart', MetaData(),
+        Column('id', Integer, primary_key=True),
+        Column('user_id', Integer, nullable=False),
+        Column('product_id', Integer, nullable=False),
+        Column('quantity', Integer, nullable=False, default=1),
+        Column('created_at', DateTime, default=datetime.utcnow),
+        Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    )
+    ops.create_tables(cart)
+    ops.create_index('cart', 'ix_cart_user_id_product_id', ['user_id', 'product_id'], unique=True)
+
+
+def hot_query_indexes(ops):
+    """Indexes for the shop order, order history and default address lookups"""
+    ops.create_index('order_items', 'ix_order_items_shop_id_order_id', ['shop_id', 'order_id'])
+    ops.create_index('orders', 'ix_orders_customer_id_created_at', ['customer_id', 'created_at'])
+    ops.create_index('addresses', 'ix_addresses_user_id_is_default', ['user_id', 'is_default'])
+
+
+def owner_and_shop_indexes(ops):
+    """Index for the per-request shop-by-owner lookup (products by shop use the (shop_id, ...) composites)"""
+    ops.create_index('shops', 'ix_shops_owner_id', ['owner_id'])
+
+
+def order_status_version(ops):
+    """Per-order status version used as the long-poll token for order tracking"""
+    ops.add_column('orders', 'status_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+def inventory_watchlists(ops):
+    """Per-product demand score plus the indexes behind the low-stock and slow-moving lists"""
+    ops.add_column('products', 'demand_score', 'DOUBLE NOT NULL DEFAULT 0')
+    ops.create_index('products', 'ix_products_shop_id_quantity', ['shop_id', 'quantity'])
+    ops.create_index('products', 'ix_products_shop_id_demand_score', ['shop_id', 'demand_score'])
+
+
+def product_forecasts_table(ops):
+    """Latest demand forecast per product (written by forecasting.py)"""
+    ops.create_tables(db.metadata.tables['product_forecasts'])
+
+
+def sold_count_indexes(ops):
+    """Indexes for best-seller lists sorted by sold_count"""
+    ops.create_index('products', 'ix_products_sold_count', ['sold_count'])
+    ops.create_index('products', 'ix_products_shop_id_sold_count', ['shop_id', 'sold_count'])
+
+
+def shop_orders(ops):
+    """Captured prices on order lines and per-shop sub-orders with stored totals.
+
+    Lines from before this migration are priced from the catalogue as it is
+    now, which is the best information left for them.
+    """
+    ops.add_column('order_items', 'unit_price', 'FLOAT NOT NULL DEFAULT 0')
+    ops.add_column('order_items', 'discount_percentage', 'FLOAT NOT NULL DEFAULT 0')
+    ops.add_column('order_items', 'line_total', 'FLOAT NOT NULL DEFAULT 0')
+    ops.execute(
+        "UPDATE order_items SET "
+        "unit_price = (SELECT price FROM products WHERE products.id = order_items.product_id), "
+        "discount_percentage = (SELECT discount_percentage FROM products WHERE products.id = order_items.product_id) "
+        "WHERE unit_price = 0 AND product_id IN (SELECT id FROM products)"
+    )
+    ops.execute(
+        "UPDATE order_items SET line_total = ROUND(unit_price * (1 - discount_percentage / 100) * quantity, 2) "
+        "WHERE line_total = 0"
+    )
+    ops.create_tables(db.metadata.tables['shop_orders'])
+    ops.create_index('shop_orders', 'ix_shop_orders_order_id_shop_id', ['order_id', 'shop_id'], unique=True)
+    ops.create_index('shop_orders', 'ix_shop_orders_shop_id_created_at', ['shop_id', 'created_at'])
+    ops.execute(
+        "INSERT INTO shop_orders (order_id, shop_id, customer_id, created_at, subtotal, item_count) "
+        "SELECT oi.order_id, oi.shop_id, o.customer_id, COALESCE(o.created_at, CURRENT_TIMESTAMP), ROUND(SUM(oi.line_total), 2), SUM(oi.quantity) "
+        "FROM order_items oi JOIN orders o ON o.id = oi.order_id "
+        "WHERE NOT EXISTS (SELECT 1 FROM shop_orders so WHERE so.order_id = oi.order_id AND so.shop_id = oi.shop_id) "
+        "GROUP BY oi.order_id, oi.shop_id, o.customer_id, o.created_at"
+    )
+
+
+def order_snapshots(ops):
+    """Product name and unit captured on order lines, plus stored JSON for final orders"""
+    ops.add_column('order_items', 'product_name', 'VARCHAR(100) NULL')
+    ops.add_column('order_items', 'unit', 'VARCHAR(20) NULL')
+    ops.add_column('orders', 'document', 'TEXT NULL')
+    ops.execute(
+        "UPDATE order_items SET "
+        "product_name = (SELECT name FROM products WHERE products.id = order_items.product_id), "
+        "unit = (SELECT unit FROM products WHERE products.id = order_items.product_id) "
+        "WHERE product_name IS NULL"
+    )
+
+
+def order_archive_tables(ops):
+    """Archive tables for old, finished orders (filled by archive.py)"""
+    metadata = db.metadata
+    ops.create_tables(*[metadata.tables[name] for name in ('orders_archive', 'order_items_archive', 'shop_orders_archive')])
+    ops.create_index('orders', 'ix_orders_status_created_at', ['status', 'created_at'])
+
+
+def product_change_log(ops):
+    """Catalogue change log behind /api/products/changes, seeded with an insert per existing product"""
+    ops.create_tables(db.metadata.tables['product_changes'])
+    # changed_at is UTC like datetime.utcnow(); MySQL's CURRENT_TIMESTAMP is in the session time zone
+    now = 'UTC_TIMESTAMP()' if ops.dialect == 'mysql' else 'CURRENT_TIMESTAMP'
+    ops.execute(
+        "INSERT INTO product_changes (product_id, op, changed_at) "
+        f"SELECT id, 'insert', {now} FROM products "
+        "WHERE id NOT IN (SELECT product_id FROM product_changes) ORDER BY id"
+    )
+
+
+def product_recommendation_tables(ops):
+    """Pair counts and related-product lists; fill them with `python recommendations.py rebuild`"""
+    ops.create_tables(db.metadata.tables['product_pairs'], db.metadata.tables['product_recommendations'])
+
+
+def product_reviews(ops):
+    """Reviews plus running rating totals on products"""
+    ops.add_column('products', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0')
+    ops.add_column('products', 'rating_count', 'INTEGER NOT NULL DEFAULT 0')
+    ops.create_tables(db.metadata.tables['reviews'])
+    ops.create_index('reviews', 'ix_reviews_product_id_user_id', ['product_id', 'user_id'], unique=True)
+    ops.create_index('reviews', 'ix_reviews_product_id_id', ['product_id', 'id'])
+
+
+def order_status_history(ops):
+    """Status history behind order tracking, seeded from what existing orders still record.
+
+    Every order gets its 'Pending' entry at created_at; orders that have
+    moved on also get their current status, with no timestamp since the
+    time of that change was never stored.
+    """
+    metadata = db.metadata
+    ops.create_tables(metadata.tables['order_status_changes'], metadata.tables['order_status_changes_archive'])
+    ops.create_index('order_status_changes', 'ix_order_status_changes_order_id_id', ['order_id', 'id'])
+    for table in ('orders', 'orders_archive'):
+        history = 'order_status_changes' if table == 'orders' else 'order_status_changes_archive'
+        ops.execute(
+            f"INSERT INTO {history} (order_id, status, changed_at) "
+            f"SELECT id, 'Pending', created_at FROM {table} "
+            f"WHERE id NOT IN (SELECT order_id FROM {history}) ORDER BY id"
+        )
+        ops.execute(
+            f"INSERT INTO {history} (order_id, status, changed_at) "
+            f"SELECT id, status, NULL FROM {table} "
+            f"WHERE status <> 'Pending' AND id NOT IN (SELECT order_id FROM {history} WHERE status <> 'Pending') ORDER BY id"
+        )
+
+
+def demand_score_double(ops):
+    """demand_score as an 8-byte float: MySQL's 4-byte FLOAT overflows in 2028 (see inventory.py).
+
+    SQLite stores every float as 8 bytes already.
+    """
+    if ops.dialect == 'mysql':
+        ops.execute("ALTER TABLE products MODIFY demand_score DOUBLE NOT NULL DEFAULT 0")
+
+
+def product_change_counter(ops):
+    """Commit-ordered sequence numbers for product_changes (see next_change_seq in app.py)"""
+    ops.create_tables(db.metadata.tables['product_change_counter'])
+    ops.execute(
+        "INSERT INTO product_change_counter (id, seq) "
+        "SELECT 1, COALESCE(MAX(seq), 0) FROM product_changes "
+        "WHERE NOT EXISTS (SELECT 1 FROM product_change_counter)"
+    )
+
+
+def drop_products_shop_id_index(ops):
+    """ix_products_shop_id duplicates the prefix of the (shop_id, ...) composite indexes.
+
+    The composites from migrations 9 and 11 also back the foreign key on
+    MySQL, so every products by shop lookup keeps an index to use.
+    """
+    ops.drop_index('products', 'ix_products_shop_id')
+
+
+MIGRATIONS = [
+    (1, 'initial_schema', initial_schema),
+    (2, 'product_catalogue_columns', product_catalogue_columns),
+    (3, 'address_columns', address_columns),
+    (4, 'order_payment_columns', order_payment_columns),
+    (5, 'cart_table', cart_table),
+    (6, 'hot_query_indexes', hot_query_indexes),
+    (7, 'owner_and_shop_indexes', owner_and_shop_indexes),
+    (8, 'order_status_version', order_status_version),
+    (9, 'inventory_watchlists', inventory_watchlists),
+    (10, 'product_forecasts_table', product_forecasts_table),
+    (11, 'sold_count_indexes', sold_count_indexes),
+    (12, 'shop_orders', shop_orders),
+    (13, 'order_snapshots', order_snapshots),
+    (14, 'order_archive_tables', order_archive_tables),
+    (15, 'product_change_log', product_change_log),
+    (16, 'product_recommendation_tables', product_recommendation_tables),
+    (17, 'product_reviews', product_reviews),
+    (18, 'order_status_history', order_status_history),
+    (19, 'demand_score_double', demand_score_double),
+    (20, 'product_change_counter', product_change_counter),
+    (21, 'drop_products_shop_id_index', drop_products_shop_id_index),
+]
+
+
+# --- Runner ---
+
+def applied_versions(conn):
+    if not inspect(conn).has_table(VERSION_TABLE):
+        return set()
+    return {row[0] for row in conn.execute(version_table.select().with_only_columns(version_table.c.version))}
+
+
+def pending_migrations(engine):
+    with engine.connect() as conn:
+        done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def migrate(engine, dry_run=False):
+    """Apply pending migrations in order. Returns the list of (version, name, statements)"""
+    results = []
+    with engine.connect() as conn:
+        # Serialise concurrent runs (e.g. several containers starting at once)
+        if engine.dialect.name == 'mysql':
+            conn.execute(text("SELECT GET_LOCK('schema_migrations', 60)"))
+            conn.commit()
+        try:
+            if not dry_run:
+                with conn.begin():
+                    version_table.create(conn, checkfirst=True)
+            done = applied_versions(conn)
+            conn.commit()
+            for version, name, fn in MIGRATIONS:
+                if version in done:
+                    continue
+                # One transaction per migration. SQLite rolls DDL back on failure;
+                # MySQL commits DDL implicitly, which is why every step is idempotent.
+                with conn.begin():
+                    ops = Operations(conn, dry_run=dry_run)
+                    fn(ops)
+                    if not dry_run:
+                        conn.execute(version_table.insert().values(
+                            version=version, name=name, applied_at=datetime.utcnow()
+                        ))
+                results.append((version, name, ops.statements))
+        finally:
+            if engine.dialect.name == 'mysql':
+                conn.execute(text("SELECT RELEASE_LOCK('schema_migrations')"))
+    return results
+
+
+def main(argv):
+    with create_app().app_context():
+        engine = db.engine
+        if '--status' in argv:
+            pending = {m[0] for m in pending_migrations(engine)}
+            for version, name, _ in MIGRATIONS:
+                print(f"{version:4d} {name:30s} {'pending' if version in pending else 'applied'}")
+            return
+
+        dry_run = '--sql' in argv
+        results = migrate(engine, dry_run=dry_run)
+        if not results:
+            print("Database schema is up to date.")
+            return
+        for version, name, statements in results:
+            if dry_run:
+                print(f"-- {version}: {name}")
+                for sql in statements:
+                    print(f"{sql};")
+            else:
+                print(f"Applied migration {version}: {name} ({len(statements)} statements)")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,227 @@
+# backend/rate_limit.py
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+# Seconds per period name accepted in rate strings like "10/minute"
+PERIODS = {
+    'second': 1,
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+
+def parse_rate(rate):
+    """Parse a rate string like '10/minute' into (capacity, tokens per second)"""
+    try:
+        count, period = rate.split('/')
+        capacity = int(count)
+        seconds = PERIODS[period.strip().rstrip('s')]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid rate limit: {rate}")
+    if capacity <= 0:
+        raise ValueError(f"Invalid rate limit: {rate}")
+    return capacity, capacity / seconds
+
+
+def refill(tokens, updated, capacity, refill_rate, now):
+    """Return the token count of a bucket after refilling it up to `now`"""
+    return min(capacity, tokens + (now - updated) * refill_rate)
+
+
+class MemoryStore:
+    """Token buckets kept in this process. Each worker enforces its own limits."""
+
+    # Idle (full) buckets are dropped by a sweep at most this often
+    SWEEP_INTERVAL = 10.0
+
+    def __init__(self):
+        # key -> (tokens, updated, time the bucket is full again)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_sweep = 0.0
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        """Take one token from the bucket. Returns (allowed, retry_after_seconds)"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = refill(tokens, updated, capacity, refill_rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Each bucket records when its own rate refills it, so a sweep
+            # never judges a slow limit by a fast limit's rate
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / refill_rate)
+            if now >= self._next_sweep:
+                self._sweep(now)
+        if allowed:
+            return True, 0
+        return False, (1 - tokens) / refill_rate
+
+    def _sweep(self, now):
+        # A bucket that has refilled completely carries no state worth keeping
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteStore:
+    """Token buckets in a SQLite file shared by every worker on the host.
+
+    Gunicorn workers are separate processes, so an in-process store lets a
+    client get N times the configured rate. Pointing all workers at the same
+    file makes the limit global. Each consume is one short write transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork (e.g. gunicorn --preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def consume(self, key, capacity, refill_rate, now=None):
+        """Take one token from the bucket. Returns (allowed, retry_after_seconds)"""
+        # Wall clock, since monotonic clocks are not comparable across processes
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?', (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = refill(tokens, updated, capacity, refill_rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO rate_limit_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if allowed:
+            return True, 0
+        return False, (1 - tokens) / refill_rate
+
+    def reset(self):
+        self._connect().execute('DELETE FROM rate_limit_buckets')
+
+
+def create_store(uri):
+    """Build a store from RATELIMIT_STORAGE_URI ('memory://' or 'sqlite:///path')"""
+    if not uri or uri == 'memory://':
+        return MemoryStore()
+    if uri.startswith('sqlite:///'):
+        return SQLiteStore(uri[len('sqlite:///'):])
+    raise ValueError(f"Unsupported rate limit storage: {uri}")
+
+
+def client_ip():
+    return request.remote_addr or 'unknown'
+
+
+def client_identity():
+    """JWT identity when a valid token is present, otherwise the client IP"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    if identity:
+        return f"user:{identity}"
+    return f"ip:{client_ip()}"
+
+
+KEY_FUNCS = {
+    'ip': lambda: f"ip:{client_ip()}",
+    'identity': client_identity,
+    'route': lambda: 'all',
+}
+
+
+class RateLimiter:
+    """Per-route token-bucket limits applied with the @limiter.limit decorator.
+
+    Config:
+        RATELIMIT_ENABLED: turn all limits off (e.g. for tests)
+        RATELIMIT_STORAGE_URI: 'memory://' (default) or 'sqlite:///path/to/file'
+    """
+
+    def __init__(self, app=None):
+        self.store = None
+        self.enabled = True
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_STORAGE_URI', os.environ.get('RATELIMIT_STORAGE_URI', 'memory://'))
+        self.enabled = app.config['RATELIMIT_ENABLED']
+        self.store = create_store(app.config['RATELIMIT_STORAGE_URI'])
+        app.extensions['rate_limiter'] = self
+
+    def limit(self, rate, key='ip'):
+        """Allow `rate` requests (e.g. '10/minute') per key for the decorated route.
+
+        key: 'ip', 'identity' (JWT identity, falling back to IP) or 'route'
+        (one bucket shared by every client). Stack decorators to combine limits.
+        Runs before the wrapped view, so rejected requests never reach the DB.
+        """
+        parse_rate(rate)
+        if key not in KEY_FUNCS:
+            raise ValueError(f"Unknown rate limit key: {key}")
+
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                rejected = self.check(rate, key)
+                if rejected is not None:
+                    return rejected
+                return fn(*args, **kwargs)
+            # Outermost decorator first; asgi.py applies the same limits to async views
+            wrapper.rate_limits = [(rate, key)] + getattr(fn, 'rate_limits', [])
+            return wrapper
+        return decorator
+
+    def check(self, rate, key='ip'):
+        """Take a token for the current request: None if allowed, otherwise a 429 response"""
+        if not self.enabled or self.store is None:
+            return None
+        capacity, refill_rate = parse_rate(rate)
+        bucket = f"{request.endpoint}:{key}:{rate}:{KEY_FUNCS[key]()}"
+        allowed, retry_after = self.store.consume(bucket, capacity, refill_rate)
+        if allowed:
+            return None
+        response = jsonify(message="Too many requests, please try again later")
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
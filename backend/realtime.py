@@ -0,0 +1,410 @@
+# backend/realtime.py
+import asyncio
+import atexit
+import hashlib
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+
+def sse(data, event=None):
+    """Encode one Server-Sent Events message"""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+# Comment line that keeps idle connections (and proxies) from timing out
+KEEPALIVE = b': keepalive\n\n'
+
+
+class Subscription:
+    def __init__(self, topic, maxsize):
+        self.topic = topic
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def get(self, timeout):
+        """Next message, or None on timeout. Raises EOFError once the hub dropped us"""
+        try:
+            message = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            if self.closed:
+                raise EOFError
+            return None
+        if message is None:
+            raise EOFError
+        return message
+
+
+class _WakingQueue(queue.Queue):
+    """A thread-safe queue that also calls `wake` for every message put"""
+
+    def __init__(self, maxsize, wake):
+        super().__init__(maxsize)
+        self._wake = wake
+
+    def _put(self, item):
+        super()._put(item)
+        self._wake()
+
+
+class AsyncSubscription(Subscription):
+    """A subscription awaited on an event loop (asgi.py) instead of a thread.
+
+    Publishers on any thread still put into a bounded queue, so the hub's
+    slow-subscriber handling is unchanged; each put also wakes the loop.
+    """
+
+    def __init__(self, topic, maxsize, loop):
+        super().__init__(topic, maxsize)
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self.queue = _WakingQueue(maxsize, self._wake)
+
+    def _wake(self):
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            pass  # Loop already closed; nobody is waiting
+
+    async def get(self, timeout):
+        """Next message, or None on timeout. Raises EOFError once the hub dropped us"""
+        deadline = self._loop.time() + timeout
+        while True:
+            try:
+                message = self.queue.get_nowait()
+            except queue.Empty:
+                if self.closed:
+                    raise EOFError
+                self._ready.clear()
+                if not self.queue.empty():
+                    continue
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if message is None:
+                raise EOFError
+            return message
+
+
+class Hub:
+    """In-process topic fan-out for streaming endpoints.
+
+    publish() sends a message to every subscriber of a topic immediately.
+    publish_later() coalesces: the render callback for a dirty topic runs
+    once per COALESCE_SECONDS window, however many writes happened and however
+    many clients are listening, and the resulting bytes are shared by all
+    subscribers. Subscribers that fall behind are disconnected rather than
+    buffered without bound; clients reconnect and start from a snapshot.
+    """
+
+    COALESCE_SECONDS = 0.5
+    QUEUE_SIZE = 32
+
+    def __init__(self, max_subscribers=200):
+        self.max_subscribers = max_subscribers
+        self._topics = {}
+        self._count = 0
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        """REALTIME_MAX_CONNECTIONS: open streams allowed per worker process"""
+        app.config.setdefault('REALTIME_MAX_CONNECTIONS', int(os.environ.get('REALTIME_MAX_CONNECTIONS', self.max_subscribers)))
+        self.max_subscribers = app.config['REALTIME_MAX_CONNECTIONS']
+
+    @property
+    def subscriber_count(self):
+        return self._count
+
+    def subscribe(self, topic, loop=None):
+        """Register a subscriber, or return None if this worker is at capacity.
+
+        With `loop`, the subscription's get() is a coroutine for that event loop.
+        """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            if loop is not None:
+                subscription = AsyncSubscription(topic, self.QUEUE_SIZE, loop)
+            else:
+                subscription = Subscription(topic, self.QUEUE_SIZE)
+            self._topics.setdefault(topic, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                self._count -= 1
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def has_subscribers(self, topic):
+        return bool(self._topics.get(topic))
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                # Too slow to keep up: drop it and let the client reconnect
+                subscription.closed = True
+                self.unsubscribe(subscription)
+
+    def publish_later(self, topic, render):
+        """Schedule render() -> bytes for `topic` in the next coalescing window"""
+        with self._lock:
+            self._dirty[topic] = render
+            if self._thread is None:
+                # Started on first use so forked workers each get their own thread
+                self._thread = threading.Thread(target=self._run, name='realtime-hub', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.COALESCE_SECONDS)
+            self._wakeup.clear()
+            with self._lock:
+                dirty, self._dirty = self._dirty, {}
+            for topic, render in dirty.items():
+                if not self.has_subscribers(topic):
+                    continue
+                try:
+                    message = render()
+                except Exception as e:
+                    print(f"Error rendering realtime update for {topic}: {e}")
+                    continue
+                if message:
+                    self.publish(topic, message)
+
+
+def default_broadcast_dir(root_path):
+    # Unix socket paths are limited to ~100 bytes, so stay short and outside the app tree
+    digest = hashlib.md5(root_path.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"realtime-{digest}")
+
+
+class Broadcaster:
+    """Deliver events to registered handlers in every worker process.
+
+    Handlers always run in the sending process. Events are also sent as Unix
+    datagrams to every other worker that has bound a socket in `directory`,
+    which is enough to fan out between gunicorn workers on one host (a
+    stand-in for Redis pub/sub or similar). Sockets left behind by dead
+    workers are removed on the first failed send. Delivery to other workers
+    is best-effort: a full receive buffer drops the event, and so does an
+    event over MAX_DATAGRAM once encoded (senders batch by encode() size).
+
+    Dashboards, home sections, the catalogue snapshot and facets are kept
+    per worker and patched by these events, so cross-worker delivery is on
+    by default. 'off' keeps events in the sending process, which is only
+    correct with a single worker; gunicorn.conf.py refuses to start more.
+    """
+
+    MAX_DATAGRAM = 64 * 1024
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._handlers = {}
+        self._sock = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """REALTIME_BROADCAST_DIR: socket directory shared by the workers ('off' = this process only).
+
+        Defaults to a directory under the system temp dir named after the
+        app's location, so the workers of one deployment find each other
+        and other deployments on the host stay apart.
+        """
+        app.config.setdefault('REALTIME_BROADCAST_DIR', os.environ.get('REALTIME_BROADCAST_DIR') or default_broadcast_dir(app.root_path))
+        directory = app.config['REALTIME_BROADCAST_DIR']
+        self.directory = None if directory.lower() == 'off' else directory
+
+    def on(self, kind, handler):
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.sock")
+
+    def start(self):
+        """Bind this process's socket. Cheap to call on every request."""
+        if not self.directory or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(os.getpid())
+            if os.path.exists(path):
+                os.remove(path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+            self._sock = sock
+            self._pid = os.getpid()
+            atexit.register(self._remove_socket, path)
+            threading.Thread(target=self._receive, args=(sock,), name='realtime-broadcast', daemon=True).start()
+
+    @staticmethod
+    def _remove_socket(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def encode(kind, data):
+        return json.dumps({'kind': kind, 'data': data}, separators=(',', ':')).encode()
+
+    def send(self, kind, **data):
+        self._dispatch(kind, data)
+        if self.directory:
+            self.start()
+            payload = self.encode(kind, data)
+            if len(payload) > self.MAX_DATAGRAM:
+                # The receivers would only get a truncated, unparseable datagram
+                print(f"Dropped realtime event {kind} for other workers: {len(payload)} bytes is over {self.MAX_DATAGRAM}")
+                return
+            self._send_remote(payload)
+
+    def _send_remote(self, payload):
+        own = f"{os.getpid()}.sock"
+        for name in os.listdir(self.directory):
+            if not name.endswith('.sock') or name == own:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                self._sock.sendto(payload, socket.MSG_DONTWAIT, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; clean up after it
+                self._remove_socket(path)
+            except (BlockingIOError, OSError) as e:
+                print(f"Dropped realtime event for {name}: {e}")
+
+    def _receive(self, sock):
+        while True:
+            try:
+                payload = sock.recv(self.MAX_DATAGRAM)
+            except OSError:
+                return
+            try:
+                message = json.loads(payload)
+            except ValueError as e:
+                print(f"Dropped unreadable realtime event ({len(payload)} bytes): {e}")
+                continue
+            self._dispatch(message['kind'], message['data'])
+
+    def _dispatch(self, kind, data):
+        for handler in self._handlers.get(kind, ()):
+            try:
+                handler(**data)
+            except Exception as e:
+                print(f"Error handling realtime event {kind}: {e}")
+
+
+class ShopDashboard:
+    """Today's live numbers per shop, kept in memory and pushed as deltas.
+
+    Counters are loaded from the database once per shop per day (via
+    `loader(shop_id, day)`, inside the app context given to init_app) and
+    then only adjusted by the order write paths.
+    """
+
+    FIELDS = ('activeUsers', 'onlineOrders', 'currentRevenue', 'pendingOrders')
+
+    def __init__(self, hub, loader):
+        self.hub = hub
+        self.loader = loader
+        self.app = None
+        self._shops = {}
+        self._sent = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        # Loads can happen on the hub or broadcast threads, outside any request
+        self.app = app
+
+    @staticmethod
+    def topic(shop_id):
+        return f"shop:{shop_id}:dashboard"
+
+    def _state(self, shop_id):
+        today = datetime.utcnow().date()
+        state = self._shops.get(shop_id)
+        if state is None or state['day'] != today:
+            with self.app.app_context():
+                loaded = self.loader(shop_id, today)
+            with self._lock:
+                state = self._shops.get(shop_id)
+                if state is None or state['day'] != today:
+                    state = self._shops[shop_id] = dict(loaded, day=today)
+        return state
+
+    def snapshot(self, shop_id):
+        state = self._state(shop_id)
+        with self._lock:
+            return {
+                'activeUsers': len(state['customers']),
+                'onlineOrders': state['orders'],
+                'currentRevenue': round(state['revenue'], 2),
+                'pendingOrders': state['pending'],
+            }
+
+    def order_placed(self, shop_id, customer_id, amount):
+        if shop_id not in self._shops:
+            return  # Loaded from the database (including this order) on first read
+        state = self._state(shop_id)
+        with self._lock:
+            state['customers'].add(customer_id)
+            state['orders'] += 1
+            state['revenue'] += amount
+            state['pending'] += 1
+        self._changed(shop_id)
+
+    def status_changed(self, shop_id, old_status, new_status, amount, created_today):
+        if shop_id not in self._shops or old_status == new_status:
+            return
+        state = self._state(shop_id)
+        with self._lock:
+            state['pending'] += (new_status == 'Pending') - (old_status == 'Pending')
+            if created_today:
+                if new_status == 'Cancelled':
+                    state['revenue'] -= amount
+                elif old_status == 'Cancelled':
+                    state['revenue'] += amount
+        self._changed(shop_id)
+
+    def _changed(self, shop_id):
+        self.hub.publish_later(self.topic(shop_id), lambda: self._render_delta(shop_id))
+
+    def _render_delta(self, shop_id):
+        """Only the fields that changed since the last broadcast"""
+        current = self.snapshot(shop_id)
+        previous = self._sent.get(shop_id, {})
+        delta = {k: v for k, v in current.items() if previous.get(k) != v}
+        self._sent[shop_id] = current
+        if not delta:
+            return None
+        return sse(delta, event='delta')
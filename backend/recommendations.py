@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# backend/recommendations.py
+"""
+Frequently-bought-together recommendations.
+
+Orders x products form a 0/1 incidence matrix X; C = X^T X counts, for every
+pair of products, the orders that contain both (the diagonal is each
+product's own order count). C is kept sparse in the product_pairs table,
+both directions stored. Each product's neighbours are ranked by lift,
+together * orders / (orders with a * orders with b), and the best TOP_K are
+stored in product_recommendations, so /api/products/<id>/related is one
+short index range read. The total number of orders is counted from the
+orders tables when ranking.
+
+The batch rebuild computes C with numpy, one chunk of orders at a time.
+Checkouts and cancellations only note their products once committed;
+RelatedRefresh folds them into the pair counts and re-ranks the lists of
+the products they touched in a background pass. Lifts of other products
+drift slightly until the next rebuild.
+
+Usage:
+    python recommendations.py rebuild   # recompute all pairs and lists from order history (e.g. nightly from cron)
+"""
+
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+# numpy is only needed for the batch rebuild; incremental updates are plain SQL
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+
+TOP_K = 10
+MIN_SUPPORT = 2  # Pairs seen in fewer orders than this are noise, whatever their lift
+PAIR_CHUNK = 2_000_000  # Upper bound on pair entries expanded at once by the rebuild
+
+
+def basket_pairs(order_index, product_index, n_products):
+    """Unique (a * n_products + b) keys and order counts for every product pair within each order.
+
+    `order_index` must be sorted, with one entry per (order, product). Every
+    order of k products expands to its k * k pairs, diagonal included.
+    """
+    import numpy as np
+    lines = len(order_index)
+    starts = np.flatnonzero(np.r_[True, order_index[1:] != order_index[:-1]])
+    sizes = np.diff(np.r_[starts, lines])
+    line_size = np.repeat(sizes, sizes)
+    left = np.repeat(np.arange(lines), line_size)
+    # Position of each expanded entry within its line's run, offset to the start of that line's order
+    within = np.arange(left.size) - np.repeat(np.cumsum(line_size) - line_size, line_size)
+    right = np.repeat(np.repeat(starts, sizes), line_size) + within
+    keys = product_index[left].astype(np.int64) * n_products + product_index[right]
+    return np.unique(keys, return_counts=True)
+
+
+def cooccurrence(order_index, product_index, n_products):
+    """Sparse X^T X as (a, b, together) arrays, built over chunks of whole orders"""
+    import numpy as np
+    starts = np.flatnonzero(np.r_[True, order_index[1:] != order_index[:-1]])
+    ends = np.r_[starts[1:], len(order_index)]
+    chunk_of_order = np.cumsum((ends - starts) ** 2) // PAIR_CHUNK
+    keys, counts = [], []
+    # chunk_of_order never decreases, so each chunk is a contiguous run of orders
+    bounds = np.flatnonzero(np.r_[True, chunk_of_order[1:] != chunk_of_order[:-1], True])
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        lo, hi = starts[first], ends[last - 1]
+        k, c = basket_pairs(order_index[lo:hi], product_index[lo:hi], n_products)
+        keys.append(k)
+        counts.append(c)
+    if not keys:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    together = np.bincount(inverse, weights=np.concatenate(counts)).astype(np.int64)
+    return keys // n_products, keys % n_products, together
+
+
+def top_related(a, b, together, n_orders, k=TOP_K):
+    """Best k neighbours per product by lift: (a, b, together, lift, rank) arrays, grouped by a"""
+    import numpy as np
+    diagonal = a == b
+    orders_with = np.zeros(int(max(a.max(), b.max())) + 1 if a.size else 0)
+    orders_with[a[diagonal]] = together[diagonal]
+    keep = ~diagonal & (together >= MIN_SUPPORT)
+    a, b, together = a[keep], b[keep], together[keep]
+    lift = together * n_orders / (orders_with[a] * orders_with[b])
+    # Same order as rank_related(): lift, then pair count, then the lower id
+    order = np.lexsort((b, -together, -lift, a))
+    a, b, together, lift = a[order], b[order], together[order], lift[order]
+    group_starts = np.flatnonzero(np.r_[True, a[1:] != a[:-1]]) if a.size else np.zeros(0, dtype=np.int64)
+    rank = np.arange(a.size) - np.repeat(group_starts, np.diff(np.r_[group_starts, a.size]))
+    keep = rank < k
+    return a[keep], b[keep], together[keep], lift[keep], rank[keep]
+
+
+def rank_related(pairs, own_orders, n_orders, k=TOP_K):
+    """top_related() for one product from its (related_id, together, related_orders) rows"""
+    scored = [
+        (together * n_orders / (own_orders * related_orders), together, related_id)
+        for related_id, together, related_orders in pairs
+        if together >= MIN_SUPPORT and own_orders and related_orders
+    ]
+    scored.sort(key=lambda s: (-s[0], -s[1], s[2]))
+    return scored[:k]
+
+
+# --- Incremental updates ---
+
+def pair_deltas(baskets):
+    """{(a, b): change in together} for (product_ids, sign) baskets, diagonal included"""
+    deltas = {}
+    for product_ids, sign in baskets:
+        ids = sorted(set(product_ids))
+        for a in ids:
+            for b in ids:
+                deltas[a, b] = deltas.get((a, b), 0) + sign
+    return deltas
+
+
+def count_pairs(baskets):
+    """Fold orders into product_pairs: each basket is (product_ids, sign), sign=-1 for a cancelled order. Commits.
+
+    Rows are locked in (product_id, related_id) order, one atomic in-place
+    update each, so concurrent passes queue on single rows instead of
+    deadlocking.
+    """
+    from app import db, ProductPair
+    table = ProductPair.__table__
+    deltas = sorted(pair_deltas(baskets).items())
+    added = [{'a': a, 'b': b, 'd': d} for (a, b), d in deltas if d > 0]
+    removed = [{'a': a, 'b': b, 'd': d} for (a, b), d in deltas if d < 0]
+    if added:
+        if db.engine.dialect.name == 'mysql':
+            from sqlalchemy.dialects.mysql import insert
+            stmt = insert(table).values(product_id=db.bindparam('a'), related_id=db.bindparam('b'), together=db.bindparam('d'))
+            stmt = stmt.on_duplicate_key_update(together=table.c.together + stmt.inserted.together)
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+            stmt = insert(table).values(product_id=db.bindparam('a'), related_id=db.bindparam('b'), together=db.bindparam('d'))
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['product_id', 'related_id'], set_={'together': table.c.together + stmt.excluded.together}
+            )
+        db.session.execute(stmt, added)
+    if removed:
+        # Only pairs that were counted can be taken back out
+        db.session.execute(
+            table.update().where(table.c.product_id == db.bindparam('a'), table.c.related_id == db.bindparam('b')).
+            values(together=table.c.together + db.bindparam('d')),
+            removed
+        )
+    db.session.commit()
+
+
+def count_orders():
+    """Non-cancelled orders across hot and archived history, the `orders` of the lift formula"""
+    from app import db, order_history_tables
+    return sum(
+        db.session.execute(db.select(db.func.count()).select_from(orders).where(orders.c.status != 'Cancelled')).scalar()
+        for orders, _ in order_history_tables()
+    )
+
+
+def upsert(table, columns):
+    """Insert rows, overwriting `columns` where the primary key already exists (for executemany)"""
+    from app import db
+    if db.engine.dialect.name == 'mysql':
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in columns})
+    from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key], set_={c: stmt.excluded[c] for c in columns}
+    )
+
+
+def refresh(product_ids, k=TOP_K):
+    """Re-rank and store the related lists of `product_ids` from the current pair counts. Commits.
+
+    Rows are written and deleted by primary key in product id order, never
+    by range, so concurrent passes lock single rows in the same order and
+    take no gap locks.
+    """
+    from app import db, ProductPair, ProductRecommendation
+    ids = sorted(set(product_ids))
+    if not ids:
+        return
+    pairs = ProductPair.__table__
+    own = pairs.alias('own')
+    rows = db.session.execute(
+        db.select(pairs.c.product_id, pairs.c.related_id, pairs.c.together, own.c.together).
+        join(own, (own.c.product_id == pairs.c.related_id) & (own.c.related_id == pairs.c.related_id)).
+        where(pairs.c.product_id.in_(ids))
+    ).all()
+    n_orders = count_orders()
+    own_orders, neighbours = {}, {pid: [] for pid in ids}
+    for product_id, related_id, together, related_orders in rows:
+        if product_id == related_id:
+            own_orders[product_id] = together
+        else:
+            neighbours[product_id].append((related_id, together, related_orders))
+
+    table = ProductRecommendation.__table__
+    stored = db.session.execute(
+        db.select(table.c.product_id, table.c.rank).where(table.c.product_id.in_(ids))
+    ).all()
+    records, sizes = [], {}
+    for pid in ids:
+        ranked = rank_related(neighbours[pid], own_orders.get(pid, 0), n_orders, k)
+        sizes[pid] = len(ranked)
+        records.extend(
+            {'product_id': pid, 'rank': rank, 'related_id': related_id, 'together': together, 'lift': lift}
+            for rank, (lift, together, related_id) in enumerate(ranked)
+        )
+    stale = [{'p': pid, 'r': rank} for pid, rank in sorted(stored) if rank >= sizes[pid]]
+    if records:
+        db.session.execute(upsert(table, ['related_id', 'together', 'lift']), records)
+    if stale:
+        db.session.execute(
+            table.delete().where(table.c.product_id == db.bindparam('p'), table.c.rank == db.bindparam('r')),
+            stale
+        )
+    db.session.commit()
+
+
+class RelatedRefresh:
+    """Count orders into product_pairs and re-rank related lists in the background.
+
+    Order writes call `count(product_ids, sign)` after they commit, so a
+    checkout takes no pair row locks. A thread per worker process folds the
+    orders noted since its last pass into product_pairs with count_pairs()
+    and then re-ranks the products they touched with refresh(), at most
+    once every RELATED_REFRESH_SECONDS. A failed step keeps its orders or
+    ids for the next pass; orders noted by a worker that exits before its
+    next pass are only counted by the next rebuild.
+
+    Config:
+        RELATED_REFRESH_SECONDS: seconds between passes (default 30)
+    """
+
+    def __init__(self):
+        self.app = None
+        self.interval = 30
+        self._baskets = []  # (product_ids, sign) of orders not counted yet
+        self._pending = set()  # Products to re-rank
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def init_app(self, app):
+        app.config.setdefault('RELATED_REFRESH_SECONDS', float(os.environ.get('RELATED_REFRESH_SECONDS', 30)))
+        self.interval = app.config['RELATED_REFRESH_SECONDS']
+        # Passes run on a background thread, outside any request
+        self.app = app
+
+    def count(self, product_ids, sign=1):
+        """Note one committed order's products (sign=-1 takes a cancelled order back out)"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Each worker has its own thread; orders noted before a fork are the parent's
+                self._pid = os.getpid()
+                self._baskets, self._pending = [], set()
+                threading.Thread(target=self._run, name='related-refresh', daemon=True).start()
+            self._baskets.append((list(product_ids), sign))
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            # Let the orders of the next interval pile up into this pass
+            time.sleep(self.interval)
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self._refresh()
+            except Exception as e:
+                print(f"Error refreshing related products: {e}")
+                self._wake.set()
+
+    def _refresh(self):
+        from app import db
+        with self._lock:
+            baskets, self._baskets = self._baskets, []
+        try:
+            count_pairs(baskets)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._baskets[:0] = baskets
+            raise
+        with self._lock:
+            for product_ids, _ in baskets:
+                self._pending.update(product_ids)
+            ids, self._pending = self._pending, set()
+        try:
+            refresh(ids)
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._pending |= ids
+            raise
+
+
+# --- Batch rebuild ---
+
+def rebuild(batch_size=5000):
+    """Recompute product_pairs and product_recommendations from non-cancelled orders. Needs an app context."""
+    if not HAS_NUMPY:
+        raise RuntimeError("Rebuilding recommendations requires numpy")
+    import numpy as np
+    from app import db, order_history_tables, ProductPair, ProductRecommendation
+
+    order_ids, product_ids = [], []
+    for orders, lines in order_history_tables():
+        rows = db.session.query(lines.c.order_id, lines.c.product_id).\
+            join(orders, orders.c.id == lines.c.order_id).\
+            filter(orders.c.status != 'Cancelled').\
+            yield_per(batch_size)
+        for order_id, product_id in rows:
+            order_ids.append(order_id)
+            product_ids.append(product_id)
+
+    order_ids = np.array(order_ids, dtype=np.int64)
+    order = np.argsort(order_ids, kind='stable')
+    products, product_index = np.unique(np.array(product_ids, dtype=np.int64)[order], return_inverse=True)
+    order_index = order_ids[order]
+    n_orders = int(np.unique(order_index).size)
+
+    a, b, together = cooccurrence(order_index, product_index, max(len(products), 1))
+    top_a, top_b, top_together, lift, rank = top_related(a, b, together, n_orders)
+
+    db.session.query(ProductPair).delete(synchronize_session=False)
+    db.session.query(ProductRecommendation).delete(synchronize_session=False)
+    pair_records = [
+        {'product_id': int(products[x]), 'related_id': int(products[y]), 'together': int(t)}
+        for x, y, t in zip(a, b, together)
+    ]
+    for i in range(0, len(pair_records), batch_size):
+        db.session.execute(db.insert(ProductPair), pair_records[i:i + batch_size])
+    records = [
+        {'product_id': int(products[x]), 'rank': int(r), 'related_id': int(products[y]), 'together': int(t), 'lift': float(l)}
+        for x, y, t, l, r in zip(top_a, top_b, top_together, lift, rank)
+    ]
+    for i in range(0, len(records), batch_size):
+        db.session.execute(db.insert(ProductRecommendation), records[i:i + batch_size])
+    db.session.commit()
+    print(f"Rebuilt recommendations from {n_orders} orders: {len(pair_records)} pairs, "
+          f"{len(set(top_a.tolist()))} products with related lists")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        print(__doc__)
+        sys.exit(1)
+    from app import create_app
+    with create_app().app_context():
+        rebuild()
@@ -0,0 +1,138 @@
+# backend/replicas.py
+import itertools
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, event
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs"""
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f"replica_{i}": url for i, url in enumerate(urls, start=1)}
+
+
+def request_identity():
+    """JWT identity if the request carries a valid token, otherwise the client IP"""
+    try:
+        identity = get_jwt_identity()
+    except RuntimeError:  # Token not verified yet on this request
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:
+            identity = None
+    return f"user:{identity}" if identity else f"ip:{request.remote_addr}"
+
+
+class ReplicaRouter:
+    """Send side-effect-free routes to read replicas.
+
+    Routes opt in with @router.read_only. Inside those requests the session
+    reads from a replica (round-robin) unless the caller wrote something within
+    the last REPLICA_STICKY_SECONDS, in which case they stay on the primary so
+    they always see their own writes despite replication lag. Flushes and
+    INSERT/UPDATE/DELETE statements always go to the primary.
+
+    Stickiness is tracked per worker process, so set REPLICA_STICKY_SECONDS
+    comfortably above the replicas' usual lag.
+
+    Config:
+        REPLICA_URLS: comma-separated replica database URLs (empty disables routing)
+        REPLICA_STICKY_SECONDS: how long a writer is pinned to the primary (default 5)
+    """
+
+    # Forget writers once the table grows past this many entries
+    MAX_WRITERS = 10000
+
+    def __init__(self, app=None, db=None):
+        self.db = None
+        self.bind_keys = []
+        self.sticky_seconds = 5
+        self._cycle = None
+        self._writers = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('REPLICA_STICKY_SECONDS', float(os.environ.get('REPLICA_STICKY_SECONDS', 5)))
+        self.db = db
+        self.sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        self.bind_keys = sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica_'))
+        self._cycle = itertools.cycle(self.bind_keys) if self.bind_keys else None
+        app.extensions['replica_router'] = self
+
+        event.listen(db.session, 'after_flush', self._mark_write)
+        event.listen(db.session, 'do_orm_execute', self._mark_bulk_write)
+        event.listen(db.session, 'after_commit', self._record_writer)
+
+    # --- Write tracking ---
+
+    def _mark_write(self, session, flush_context):
+        session.info['wrote'] = True
+
+    def _mark_bulk_write(self, orm_execute_state):
+        if not orm_execute_state.is_select:
+            orm_execute_state.session.info['wrote'] = True
+
+    def _record_writer(self, session):
+        if not session.info.pop('wrote', False) or not has_request_context():
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._writers[request_identity()] = now
+            if len(self._writers) > self.MAX_WRITERS:
+                cutoff = now - self.sticky_seconds
+                self._writers = {k: t for k, t in self._writers.items() if t > cutoff}
+
+    def wrote_recently(self, identity):
+        written = self._writers.get(identity)
+        return written is not None and time.monotonic() - written < self.sticky_seconds
+
+    # --- Routing ---
+
+    def may_use_replica(self):
+        """Whether the current request can read from a replica"""
+        return bool(self._cycle) and not self.wrote_recently(request_identity())
+
+    def next_replica(self):
+        with self._lock:
+            return next(self._cycle)
+
+    def replica_engine(self):
+        """Engine to read from for this request, or None to use the primary"""
+        if not self._cycle or not has_request_context() or not g.get('use_replica'):
+            return None
+        key = g.get('replica_bind')
+        if key is None:
+            # One replica per request so all its reads see the same snapshot
+            key = g.replica_bind = self.next_replica()
+        return self.db.engines[key]
+
+    def read_only(self, fn):
+        """Mark a view as side-effect free so its queries may use a replica"""
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if self.may_use_replica():
+                g.use_replica = True
+            return fn(*args, **kwargs)
+        wrapper.read_only = True  # Lets asgi.py route the view's async twin the same way
+        return wrapper
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica when the current request allows it"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, (Insert, Update, Delete)):
+            router = current_app.extensions.get('replica_router') if has_request_context() else None
+            engine = router.replica_engine() if router else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# backend/sketches.py
+"""
+Mergeable summaries behind the funnel and retention analytics.
+
+- HyperLogLog sketches count distinct visitors/customers per funnel step,
+  shop and day. Sketches for a date range are merged (register-wise max),
+  which gives distinct counts over the whole range, not a sum of days.
+- Activity bitmaps record which customer ids ordered from a shop in each
+  week/month (bit n set = customer n active). Cohorts and retention are
+  derived from them with a few big-integer ANDs at query time.
+
+Both structures merge by union, so every worker keeps its own in-memory
+deltas and folds them into a shared SQLite file from a background thread
+every FLUSH_INTERVAL and once more when the process exits; merging the
+same data twice is harmless. Nothing here touches the main database.
+
+Usage:
+    python sketches.py rebuild   # rebuild all sketches from orders + the event store
+"""
+
+import atexit
+import hashlib
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# 2^12 registers: ~1.6% standard error in 4 KB per sketch
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+_HASH_BITS = 64
+_RANK_BITS = _HASH_BITS - HLL_PRECISION
+_POWERS = [2.0 ** -r for r in range(_RANK_BITS + 2)]
+
+# Funnel step -> event names that count towards it. Every event counts as a visit.
+FUNNEL_EVENTS = {
+    'productViews': {'product_view'},
+    'addToCart': {'add_to_cart'},
+    'checkout': {'begin_checkout', 'checkout'},
+}
+FUNNEL_STEPS = ['visitors', 'productViews', 'addToCart', 'checkout', 'orders']
+
+# Pseudo shop id for sketches across all shops
+ALL_SHOPS = 0
+
+GRANULARITIES = ('week', 'month')
+
+
+class HyperLogLog:
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers is not None else bytearray(HLL_REGISTERS)
+
+    def add(self, value):
+        x = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), 'big')
+        index = x >> _RANK_BITS
+        rest = x & ((1 << _RANK_BITS) - 1)
+        rank = _RANK_BITS - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = HLL_REGISTERS
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(_POWERS[r] for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        return bytes(self.registers)
+
+
+def period_key(day, granularity):
+    """'2026-W07' style week keys or '2026-02' month keys"""
+    if granularity == 'week':
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    return f"{day.year}-{day.month:02d}"
+
+
+def periods_between(start, end, granularity):
+    """Ordered period keys covering [start, end]"""
+    keys = []
+    day = start
+    while day <= end:
+        key = period_key(day, granularity)
+        if not keys or keys[-1] != key:
+            keys.append(key)
+        day += timedelta(days=7 if granularity == 'week' else 1)
+    end_key = period_key(end, granularity)
+    if keys[-1] != end_key:
+        keys.append(end_key)
+    return keys
+
+
+class SketchStore:
+    """Per-worker sketch deltas, flushed into a SQLite file shared by all workers"""
+
+    # Fold deltas into the shared file this often
+    FLUSH_INTERVAL = 2.0
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hll = {}
+        self._bitmaps = {}
+        self._flusher_pid = None
+        with self._connect() as conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS sketches (key TEXT PRIMARY KEY, data BLOB NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection inherited across fork (e.g. gunicorn --preload) must not be reused
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # --- Write path ---
+
+    def _hll_delta(self, step, shop_id, day):
+        return self._hll_delta_key(f"hll:{step}:{shop_id}:{day.isoformat()}")
+
+    def _hll_delta_key(self, key):
+        sketch = self._hll.get(key)
+        if sketch is None:
+            sketch = self._hll[key] = HyperLogLog()
+        return sketch
+
+    def record_events(self, rows):
+        """Feed validated event rows (see event_store.COLUMNS) into the funnel sketches"""
+        with self._lock:
+            for timestamp, name, user_id, session_id, shop_id, _ in rows:
+                visitor = user_id or session_id
+                if not visitor:
+                    continue
+                day = datetime.utcfromtimestamp(timestamp / 1000).date()
+                shops = (ALL_SHOPS, shop_id) if shop_id > 0 else (ALL_SHOPS,)
+                for shop in shops:
+                    self._hll_delta('visitors', shop, day).add(visitor)
+                    for step, names in FUNNEL_EVENTS.items():
+                        if name in names:
+                            self._hll_delta(step, shop, day).add(visitor)
+        self._start_flusher()
+
+    def record_order(self, customer_id, shop_ids, when):
+        """Count an order towards the 'orders' step and the activity bitmaps"""
+        day = when.date()
+        with self._lock:
+            for shop in {ALL_SHOPS, *shop_ids}:
+                self._hll_delta('orders', shop, day).add(f"user:{customer_id}")
+                for granularity in GRANULARITIES:
+                    key = f"active:{granularity}:{shop}:{period_key(day, granularity)}"
+                    self._bitmaps[key] = self._bitmaps.get(key, 0) | (1 << customer_id)
+        self._start_flusher()
+
+    def _start_flusher(self):
+        """Start this process's flush thread on its first delta"""
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            # Threads do not survive a fork; each worker starts its own
+            self._flusher_pid = os.getpid()
+        atexit.register(self._flush_quietly)
+        threading.Thread(target=self._run_flusher, name='sketch-flush', daemon=True).start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.FLUSH_INTERVAL)
+            self._flush_quietly()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing sketches: {e}")
+
+    def flush(self):
+        """Merge this worker's deltas into the shared file"""
+        with self._lock:
+            hll, self._hll = self._hll, {}
+            bitmaps, self._bitmaps = self._bitmaps, {}
+        if not hll and not bitmaps:
+            return
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            stored = self._load(conn, list(hll) + list(bitmaps))
+            for key, sketch in hll.items():
+                if key in stored:
+                    sketch.merge(HyperLogLog(stored[key]))
+                conn.execute('INSERT OR REPLACE INTO sketches (key, data) VALUES (?, ?)', (key, sketch.to_bytes()))
+            for key, bits in bitmaps.items():
+                if key in stored:
+                    bits |= int.from_bytes(stored[key], 'little')
+                data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+                conn.execute('INSERT OR REPLACE INTO sketches (key, data) VALUES (?, ?)', (key, data))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            # Keep the deltas for the next flush
+            with self._lock:
+                for key, sketch in hll.items():
+                    self._hll_delta_key(key).merge(sketch)
+                for key, bits in bitmaps.items():
+                    self._bitmaps[key] = self._bitmaps.get(key, 0) | bits
+            raise
+
+    @staticmethod
+    def _load(conn, keys):
+        stored = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            placeholders = ','.join('?' * len(chunk))
+            stored.update(conn.execute(f"SELECT key, data FROM sketches WHERE key IN ({placeholders})", chunk))
+        return stored
+
+    # --- Read path ---
+
+    def funnel(self, shop_id, start, end):
+        """Distinct visitors per funnel step over [start, end]"""
+        self.flush()
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        result = {}
+        for step in FUNNEL_STEPS:
+            keys = [f"hll:{step}:{shop_id}:{day.isoformat()}" for day in days]
+            merged = HyperLogLog()
+            for data in self._load(self._connect(), keys).values():
+                merged.merge(HyperLogLog(data))
+            result[step] = merged.count()
+        return result
+
+    def retention(self, shop_id, start, end, granularity='month'):
+        """Share of each cohort (customers by first order period) still ordering N periods later"""
+        self.flush()
+        periods = periods_between(start, end, granularity)
+        keys = [f"active:{granularity}:{shop_id}:{p}" for p in periods]
+        stored = self._load(self._connect(), keys)
+        active = [int.from_bytes(stored.get(k, b''), 'little') for k in keys]
+
+        # Customers who ordered before the window belong to older cohorts,
+        # so start from everything active in earlier periods
+        prefix = f"active:{granularity}:{shop_id}:"
+        seen = 0
+        for (data,) in self._connect().execute(
+            'SELECT data FROM sketches WHERE key >= ? AND key < ?', (prefix, prefix + periods[0])
+        ):
+            seen |= int.from_bytes(data, 'little')
+
+        cohorts = []
+        for bits in active:
+            cohorts.append(bits & ~seen)
+            seen |= bits
+
+        rows = []
+        for offset in range(1, len(periods)):
+            retained = total = 0
+            for i in range(len(periods) - offset):
+                size = cohorts[i].bit_count()
+                if size:
+                    total += size
+                    retained += (cohorts[i] & active[i + offset]).bit_count()
+            rows.append({
+                'period': f"{granularity.capitalize()} {offset}",
+                'retentionRate': round(retained / total * 100, 2) if total else 0,
+                'cohortCustomers': total,
+            })
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._hll.clear()
+            self._bitmaps.clear()
+        self._connect().execute('DELETE FROM sketches')
+
+
+def default_path():
+    return os.environ.get('SKETCH_STORE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sketches.db'))
+
+
+def rebuild():
+    """Recompute every sketch from the orders tables and the event store. Needs an app context."""
+    from app import db, event_store, order_history_tables, sketch_store
+    from event_store import COLUMNS
+
+    sketch_store.reset()
+    orders = {}
+    for order_table, lines in order_history_tables():
+        rows = db.session.query(order_table.c.id, order_table.c.customer_id, order_table.c.created_at, lines.c.shop_id).\
+            join(lines, order_table.c.id == lines.c.order_id).\
+            yield_per(5000)
+        for order_id, customer_id, created_at, shop_id in rows:
+            orders.setdefault(order_id, (customer_id, created_at, set()))[2].add(shop_id)
+    for customer_id, created_at, shop_ids in orders.values():
+        sketch_store.record_order(customer_id, shop_ids, created_at)
+
+    events = 0
+    for _, block in event_store.scan(date.min, date.max):
+        rows = list(zip(*(block[c] for c in COLUMNS)))
+        sketch_store.record_events(rows)
+        events += len(rows)
+    sketch_store.flush()
+    print(f"Rebuilt sketches from {len(orders)} orders and {events} events")
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] != ['rebuild']:
+        print(__doc__)
+        sys.exit(1)
+    from app import create_app
+    with create_app().app_context():
+        rebuild()
@@ -0,0 +1,160 @@
+# backend/snapshots.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class Scope:
+    __slots__ = ('products', 'loaded_at', 'body', 'etag', 'refreshing')
+
+    def __init__(self, products):
+        self.products = products  # product id -> item
+        self.loaded_at = time.monotonic()
+        self.body = None  # Rendered JSON; None once a change comes in
+        self.etag = None
+        self.refreshing = False
+
+
+class ScopedSnapshots:
+    """Rendered JSON per scope (a city, a shop...), kept in memory and patched from product change events.
+
+    The first request for a scope loads its products with `loader`; after
+    that, product change events (sent to every worker by the Broadcaster)
+    patch the loaded scopes, and a scope's JSON is rendered again on the
+    next read only if one of its items actually changed. Scopes older than
+    the max age are reloaded in the background, which also picks up changes
+    made outside the app (scripts, migrations), while the stale body keeps
+    being served. Events that arrive while a scope is loading are kept and
+    replayed onto the fresh copy, since the loader may have read the rows
+    before they changed.
+
+    Subclasses define how a scope is loaded, indexed, matched and rendered.
+    """
+
+    # Config key and default for the seconds before a scope is reloaded
+    MAX_AGE_CONFIG = None
+    DEFAULT_MAX_AGE = 600
+    # Scopes held per worker; the least recently loaded is dropped beyond this
+    MAX_SCOPES = 256
+    NAME = 'snapshot'
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.app = None
+        self.max_age = self.DEFAULT_MAX_AGE
+        self._scopes = {}
+        self._loading = {}  # key -> event buffers of the loads in progress
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault(self.MAX_AGE_CONFIG, int(os.environ.get(self.MAX_AGE_CONFIG, self.DEFAULT_MAX_AGE)))
+        self.max_age = app.config[self.MAX_AGE_CONFIG]
+        # Reloads run on a background thread, outside any request
+        self.app = app
+
+    # --- Subclass hooks ---
+
+    def read(self, key):
+        """Load the scope's rows from the database"""
+        return self.loader(key)
+
+    def index(self, rows):
+        """{product id: item} from loaded rows"""
+        raise NotImplementedError
+
+    def matches(self, key, product):
+        """Whether a product list item from a change event belongs in the scope"""
+        raise NotImplementedError
+
+    def item(self, product):
+        """The scope's item for a product list item from a change event"""
+        return product
+
+    def render(self, key, items):
+        raise NotImplementedError
+
+    # --- Reads ---
+
+    def get(self, key):
+        """(JSON body, ETag) for a scope"""
+        scope = self._scopes.get(key)
+        if scope is None:
+            scope = self._load(key)
+        elif time.monotonic() - scope.loaded_at > self.max_age and not scope.refreshing:
+            scope.refreshing = True
+            threading.Thread(target=self._reload, args=(key,), name=f"{self.NAME}-refresh", daemon=True).start()
+        with self._lock:
+            if scope.body is None:
+                scope.body = json.dumps(self.render(key, scope.products.values()), separators=(',', ':'))
+                scope.etag = hashlib.md5(scope.body.encode()).hexdigest()
+            return scope.body, scope.etag
+
+    def _load(self, key):
+        events = []
+        with self._lock:
+            self._loading.setdefault(key, []).append(events)
+        try:
+            scope = Scope(self.index(self.read(key)))
+            with self._lock:
+                for products, deleted, expired in events:
+                    self._patch(key, scope, products, deleted)
+                    if expired:
+                        scope.loaded_at = float('-inf')
+                self._scopes.pop(key, None)
+                self._scopes[key] = scope
+                while len(self._scopes) > self.MAX_SCOPES:
+                    del self._scopes[next(iter(self._scopes))]
+        finally:
+            with self._lock:
+                loading = self._loading[key]
+                loading.remove(events)
+                if not loading:
+                    del self._loading[key]
+        return scope
+
+    def _reload(self, key):
+        try:
+            with self.app.app_context():
+                self._load(key)
+        except Exception as e:
+            print(f"Error reloading {self.NAME} for {key!r}: {e}")
+            scope = self._scopes.get(key)
+            if scope is not None:
+                scope.refreshing = False
+
+    # --- Change events ---
+
+    def apply(self, products=(), deleted=(), ids=()):
+        """Patch every loaded scope with changed product list items and deleted product ids.
+
+        Changed `ids` that came without an item (too large to broadcast)
+        could belong to any scope, so every scope is reloaded on its next read.
+        """
+        sent = {product['id'] for product in products}
+        expired = any(product_id not in sent for product_id in ids)
+        with self._lock:
+            for key, scope in self._scopes.items():
+                if self._patch(key, scope, products, deleted):
+                    scope.body = None
+                if expired:
+                    scope.loaded_at = float('-inf')
+            for loading in self._loading.values():
+                for events in loading:
+                    events.append((products, deleted, expired))
+
+    def _patch(self, key, scope, products, deleted):
+        """Apply one change event to a scope. Returns whether any item changed."""
+        changed = False
+        for product_id in deleted:
+            changed |= scope.products.pop(product_id, None) is not None
+        for product in products:
+            if self.matches(key, product):
+                item = self.item(product)
+                if scope.products.get(product['id']) != item:
+                    scope.products[product['id']] = item
+                    changed = True
+            else:
+                changed |= scope.products.pop(product['id'], None) is not None
+        return changed
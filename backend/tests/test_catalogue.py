@@ -0,0 +1,121 @@
+# backend/tests/test_catalogue.py
+import itertools
+import random
+
+import pytest
+from sqlalchemy import delete, insert, update
+from werkzeug.datastructures import MultiDict
+
+from app import Product, Shop, User, db, load_catalogue_rows, product_listing, shops_in_city
+from catalogue import CatalogueSnapshot
+
+CITIES = ['Hyderabad', 'Secunderabad', 'Pune']
+CATEGORIES = ['Vegetables', 'Fruits', 'Dairy']
+
+
+@pytest.fixture
+def seeded(app):
+    rng = random.Random(7)
+    db.session.execute(insert(User), [
+        {'id': i, 'name': f"Owner {i}", 'email': f"owner{i}@example.com", 'password_hash': 'x', 'role': 'admin',
+         'city': CITIES[i % 3]}
+        for i in range(1, 7)
+    ])
+    db.session.execute(insert(Shop), [
+        {'id': i, 'name': f"Shop {i}", 'city': CITIES[i % 3], 'owner_id': i} for i in range(1, 7)
+    ])
+    # Few distinct prices and sales, so the id tie-breaker decides most of the order
+    db.session.execute(insert(Product), [
+        {'id': i, 'name': f"Product {i}", 'price': rng.choice([10.0, 25.5, 40.0]), 'shop_id': rng.randint(1, 6),
+         'quantity': rng.randint(0, 50), 'category': rng.choice(CATEGORIES), 'featured': rng.random() < 0.3,
+         'sold_count': rng.randint(0, 4)}
+        for i in range(1, 121)
+    ])
+    db.session.commit()
+    return rng
+
+
+def sql_ids(args, shop_id=None, city=None):
+    criteria = []
+    if shop_id is not None:
+        criteria.append(Product.shop_id == shop_id)
+    if city is not None:
+        shop_ids = db.session.execute(shops_in_city(city).with_only_columns(Shop.id)).scalars().all()
+        criteria.append(Product.shop_id.in_(shop_ids))
+    return [row.id for row in db.session.execute(product_listing(args, ['id'], *criteria))]
+
+
+def snapshot_ids(snapshot, args, **filters):
+    featured = args.get('featured')
+    if featured is not None:
+        filters['featured'] = featured == 'true'
+    if args.get('category'):
+        filters['category'] = args['category']
+    positions = snapshot.select(
+        sort_by=args.get('sortBy'), ascending=args.get('sortOrder') == 'asc', limit=args.get('limit', type=int),
+        **filters,
+    )
+    return [item['id'] for item in snapshot.items(positions, ['id'])]
+
+
+def listing_cases():
+    sorts = [{}, {'sortBy': 'price'}, {'sortBy': 'price', 'sortOrder': 'asc'},
+             {'sortBy': 'sold_count'}, {'sortBy': 'sold_count', 'sortOrder': 'asc'}]
+    filters = [{}, {'featured': 'true'}, {'featured': 'false'}, {'category': 'Fruits'},
+               {'category': 'Dairy', 'featured': 'true'}, {'category': 'Nuts'}]
+    limits = [{}, {'limit': '5'}]
+    scopes = [{}, {'shop_id': 2}, {'shop_id': 99}, {'city': 'hyderabad'}, {'city': 'Pune'}, {'city': 'nowhere'}]
+    for sort, filter_, limit, scope in itertools.product(sorts, filters, limits, scopes):
+        yield MultiDict({**sort, **filter_, **limit}), scope
+
+
+def assert_matches_sql(snapshot):
+    for args, scope in listing_cases():
+        assert snapshot_ids(snapshot, args, **scope) == sql_ids(args, **scope), (args, scope)
+
+
+def test_select_matches_sql_order(seeded):
+    snapshot = CatalogueSnapshot(load_catalogue_rows())
+    assert snapshot.size == 120
+    assert_matches_sql(snapshot)
+
+
+def test_patched_updates_match_sql_order(seeded):
+    snapshot = CatalogueSnapshot(load_catalogue_rows())
+    changed = [3, 17, 60, 61, 118]
+    for product_id in changed:
+        db.session.execute(update(Product).where(Product.id == product_id).values(
+            price=seeded.choice([10.0, 25.5, 99.0]), sold_count=seeded.randint(0, 6),
+            featured=not db.session.get(Product, product_id).featured, category='Fruits',
+            shop_id=seeded.randint(1, 6),
+        ))
+    db.session.commit()
+
+    patched = snapshot.patched(load_catalogue_rows(changed), ())
+    assert_matches_sql(patched)
+    # The original snapshot is left as it was
+    assert list(snapshot.rows()) != list(patched.rows())
+    assert patched.size == snapshot.size == 120
+
+
+def test_patched_inserts_and_deletes_match_sql_order(seeded):
+    snapshot = CatalogueSnapshot(load_catalogue_rows())
+    db.session.execute(insert(Product), [
+        {'id': i, 'name': f"Product {i}", 'price': 25.5, 'shop_id': 2, 'quantity': 5, 'category': 'Dairy',
+         'featured': True, 'sold_count': 3}
+        for i in (121, 200)
+    ])
+    db.session.execute(update(Product).where(Product.id == 50).values(price=10.0))
+    db.session.execute(delete(Product).where(Product.id.in_([1, 64, 120])))
+    db.session.commit()
+
+    patched = snapshot.patched(load_catalogue_rows([121, 200, 50]), [1, 64, 120])
+    assert patched.size == 119
+    assert_matches_sql(patched)
+
+
+def test_patched_with_no_changes_keeps_the_order(seeded):
+    snapshot = CatalogueSnapshot(load_catalogue_rows())
+    patched = snapshot.patched(load_catalogue_rows([5, 6]), ())
+    assert list(patched.rows()) == list(snapshot.rows())
+    assert_matches_sql(patched)
@@ -0,0 +1,131 @@
+# backend/tests/test_event_store.py
+import gzip
+import json
+import os
+import random
+from datetime import date, datetime
+
+import pytest
+
+import event_store
+from event_store import (
+    COLUMNS, EventStore, InvalidEvent, decode_block, encode_block, parse_batch, read_rows, validate_event,
+    write_blocks,
+)
+
+DAY = date(2026, 3, 14)
+
+
+def make_rows(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        (rng.randint(1, 10 ** 12), rng.choice(['view', 'add_to_cart', 'checkout', 'ünïcode']),
+         f"user-{rng.randint(0, 50)}", f"session-{rng.randint(0, 20)}" if i % 7 else '',
+         rng.choice([-1, 3, 2 ** 31 - 1, -2 ** 31]), json.dumps({'i': i}))
+        for i in range(n)
+    ]
+
+
+def rows_of(blocks):
+    return [row for block in blocks for row in zip(*(block[c] for c in COLUMNS))]
+
+
+def test_block_round_trip():
+    rows = make_rows(500)
+    assert rows_of([decode_block(encode_block(rows)[event_store.HEADER.size:])]) == rows
+
+
+def test_decode_skips_unrequested_columns():
+    block = decode_block(encode_block(make_rows(10))[event_store.HEADER.size:], columns=('name', 'shop_id'))
+    assert list(block) == ['name', 'shop_id']
+
+
+def test_validate_event_builds_a_row():
+    row = validate_event({'name': 'view', 'timestamp': 1700000000123.9, 'userId': 42,
+                          'properties': {'shop_id': 7, 'path': '/'}})
+    assert row == (1700000000123, 'view', '42', '', 7, '{"shop_id":7,"path":"/"}')
+
+
+@pytest.mark.parametrize('event', [
+    [],
+    {'timestamp': 1},
+    {'name': 'x' * 65, 'timestamp': 1},
+    {'name': 'view', 'timestamp': True},
+    {'name': 'view', 'timestamp': float('nan')},
+    {'name': 'view', 'timestamp': float('inf')},
+    {'name': 'view', 'timestamp': 0},
+    {'name': 'view', 'timestamp': 2 ** 63},
+    {'name': 'view', 'timestamp': 1, 'userId': ['x']},
+    {'name': 'view', 'timestamp': 1, 'properties': ['shop_id']},
+    {'name': 'view', 'timestamp': 1, 'properties': {'shop_id': 2 ** 31}},
+    {'name': 'view', 'timestamp': 1, 'properties': {'blob': 'x' * 5000}},
+])
+def test_validate_event_rejects(event):
+    with pytest.raises(InvalidEvent):
+        validate_event(event)
+
+
+def test_parse_batch():
+    events = [{'name': 'view', 'timestamp': 1}]
+    assert parse_batch(json.dumps({'events': events}).encode()) == events
+    assert parse_batch(gzip.compress(json.dumps(events).encode()), 'gzip') == events
+    for body in (b'not json', b'{"events": 1}', json.dumps([{}] * 1001).encode()):
+        with pytest.raises(InvalidEvent):
+            parse_batch(body)
+    with pytest.raises(InvalidEvent):
+        parse_batch(b'plain', 'gzip')
+
+
+def test_write_compact_scan_yields_the_same_rows(tmp_path, monkeypatch):
+    # Small runs so compaction sorts to run files and merges them
+    monkeypatch.setattr(event_store, 'COMPACT_RUN_ROWS', 300)
+    monkeypatch.setattr(event_store, 'RUN_BLOCK_ROWS', 40)
+    monkeypatch.setattr(event_store, 'COMPACT_BLOCK_ROWS', 250)
+    store = EventStore(str(tmp_path))
+    rows = make_rows(1000)
+    for i in range(0, 600, 100):
+        store.append(rows[i:i + 100], now=datetime(2026, 3, 14, 12))
+    # A second worker's part file for the same day
+    write_blocks(os.path.join(store.partition(DAY), 'part-other.evb'), rows[600:], 70)
+
+    before = rows_of(block for _, block in store.scan(DAY, DAY))
+    assert sorted(before) == sorted(rows)
+
+    assert store.compact(DAY) == len(rows)
+    assert [os.path.basename(p) for p in store.files(DAY)] == ['compacted.evb']
+    after = rows_of(block for _, block in store.scan(DAY, DAY))
+    # Sorted by timestamp; rows with equal timestamps keep their file order
+    assert after == sorted(before, key=lambda row: row[0])
+    assert store.compact(DAY) == 0
+
+
+def test_scan_stops_at_a_torn_trailing_block(tmp_path):
+    store = EventStore(str(tmp_path))
+    rows = make_rows(20)
+    store.append(rows, now=datetime(2026, 3, 14))
+    path = store.files(DAY)[0]
+    with open(path, 'ab') as f:
+        f.write(encode_block(make_rows(5, seed=2))[:-3])
+    assert list(read_rows(path)) == rows
+
+
+def test_compact_closed_days_leaves_today(tmp_path):
+    store = EventStore(str(tmp_path))
+    store.append(make_rows(3), now=datetime(2026, 3, 13))
+    store.append(make_rows(4), now=datetime(2026, 3, 14))
+    assert store.compact_closed_days(today=DAY) == {date(2026, 3, 13): 3}
+    assert [os.path.basename(p) for p in store.files(DAY)] == [f"part-{os.getpid()}.evb"]
+
+
+def test_ingest_endpoint_counts_rejected_events(app, client):
+    body = gzip.compress(json.dumps({'events': [
+        {'name': 'view', 'timestamp': 1700000000000, 'properties': {'shop_id': 1}},
+        {'name': 'view', 'timestamp': 'yesterday'},
+    ]}).encode())
+    response = client.post('/api/events/batch', data=body, headers={'Content-Encoding': 'gzip'},
+                           content_type='application/json')
+    assert response.status_code == 202
+    assert response.json == {'accepted': 1, 'rejected': 1}
+    store = app.extensions['event_store']
+    rows = rows_of(block for _, block in store.scan(date.min, date.max))
+    assert rows == [(1700000000000, 'view', '', '', 1, '{"shop_id":1}')]
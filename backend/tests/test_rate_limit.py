@@ -0,0 +1,66 @@
+# backend/tests/test_rate_limit.py
+import pytest
+
+from rate_limit import MemoryStore, SQLiteStore, parse_rate, refill
+
+
+def test_parse_rate():
+    assert parse_rate('10/minute') == (10, 10 / 60)
+    assert parse_rate('2/seconds') == (2, 2)
+    for rate in ('10', '0/minute', 'x/minute', '10/fortnight'):
+        with pytest.raises(ValueError):
+            parse_rate(rate)
+
+
+def test_refill_is_capped_at_capacity():
+    assert refill(0, 0, capacity=5, refill_rate=1, now=2) == 2
+    assert refill(3, 0, capacity=5, refill_rate=1, now=100) == 5
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / 'buckets.db'))
+
+
+def test_bucket_empties_then_refills(store):
+    capacity, rate = parse_rate('3/minute')
+    assert [store.consume('k', capacity, rate, now=100)[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = store.consume('k', capacity, rate, now=100)
+    assert not allowed
+    assert retry_after == pytest.approx(20)
+    # One token back after 20 seconds, and only one
+    assert store.consume('k', capacity, rate, now=120) == (True, 0)
+    assert not store.consume('k', capacity, rate, now=120)[0]
+
+
+def test_buckets_are_per_key(store):
+    capacity, rate = parse_rate('1/hour')
+    assert store.consume('a', capacity, rate, now=0)[0]
+    assert not store.consume('a', capacity, rate, now=1)[0]
+    assert store.consume('b', capacity, rate, now=1)[0]
+
+
+def test_memory_sweep_keeps_buckets_that_are_not_full():
+    store = MemoryStore()
+    store.consume('slow', 1, 1 / 3600, now=0)
+    store.consume('fast', 10, 10, now=0)
+    store.consume('fast', 10, 10, now=MemoryStore.SWEEP_INTERVAL + 1)
+    # The hourly bucket is still empty after the sweep, so it must not reset to full
+    assert not store.consume('slow', 1, 1 / 3600, now=MemoryStore.SWEEP_INTERVAL + 2)[0]
+
+
+def test_over_limit_request_gets_429_with_retry_after(app, client):
+    app.extensions['rate_limiter'].enabled = True
+    body = {'name': 'x', 'password': 'secret', 'role': 'customer', 'city': 'Hyderabad'}
+    # POST /api/auth/register allows 5 per minute per IP
+    for i in range(5):
+        assert client.post('/api/auth/register', json=dict(body, email=f"u{i}@example.com")).status_code == 201
+    response = client.post('/api/auth/register', json=dict(body, email='u5@example.com'))
+    assert response.status_code == 429
+    assert 1 <= int(response.headers['Retry-After']) <= 12
+    # Another client has its own bucket
+    response = client.post('/api/auth/register', json=dict(body, email='u6@example.com'),
+                           environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert response.status_code == 201
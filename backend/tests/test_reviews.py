@@ -0,0 +1,131 @@
+# backend/tests/test_reviews.py
+import pytest
+
+from sqlalchemy import insert
+
+from app import REVIEWS_MAX_LIMIT, Product, Review, User, db
+from conftest import register
+
+
+@pytest.fixture
+def product_id(client, admin):
+    response = client.post('/api/products', json={'name': 'Tomatoes', 'price': 30, 'quantity': 2}, headers=admin)
+    return response.json['product_id']
+
+
+@pytest.fixture
+def customers(client):
+    return [register(client, f"buyer{i}@example.com", 'customer') for i in range(7)]
+
+
+def review_url(product_id, review_id=None):
+    url = f"/api/products/{product_id}/reviews"
+    return f"{url}/{review_id}" if review_id else url
+
+
+def assert_totals_match_reviews(product_id):
+    db.session.expire_all()
+    product = db.session.get(Product, product_id)
+    count, total = db.session.execute(
+        db.select(db.func.count(), db.func.coalesce(db.func.sum(Review.rating), 0)).where(Review.product_id == product_id)
+    ).one()
+    average = db.session.execute(db.select(db.func.avg(Review.rating)).where(Review.product_id == product_id)).scalar()
+    assert (product.rating_count, product.rating_sum) == (count, total)
+    return count, average
+
+
+def test_pages_walk_every_review_once(client, product_id, customers):
+    posted = [
+        client.post(review_url(product_id), json={'rating': i % 5 + 1, 'comment': f"#{i}"}, headers=headers).json['id']
+        for i, headers in enumerate(customers)
+    ]
+
+    seen, cursor = [], None
+    while True:
+        query = {'limit': 3, **({'before': cursor} if cursor else {})}
+        page = client.get(review_url(product_id), query_string=query).json
+        assert len(page['reviews']) <= 3
+        assert page['total'] == len(customers)
+        seen += [review['id'] for review in page['reviews']]
+        cursor = page['nextCursor']
+        if cursor is None:
+            break
+    assert seen == sorted(posted, reverse=True)
+
+
+def test_pages_stay_consistent_when_reviews_are_added(client, product_id, customers):
+    for headers in customers[:3]:
+        client.post(review_url(product_id), json={'rating': 4}, headers=headers)
+    first = client.get(review_url(product_id), query_string={'limit': 2}).json
+    # Newer reviews land before the cursor and never shift the next page
+    for headers in customers[3:]:
+        client.post(review_url(product_id), json={'rating': 2}, headers=headers)
+    second = client.get(review_url(product_id), query_string={'limit': 2, 'before': first['nextCursor']}).json
+
+    ids = [review['id'] for review in first['reviews'] + second['reviews']]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 3
+    assert second['nextCursor'] is None
+
+
+def test_limit_is_validated_and_capped(client, product_id):
+    assert client.get(review_url(product_id), query_string={'limit': 0}).status_code == 400
+    assert client.get(review_url(9999)).status_code == 404
+    db.session.execute(insert(User), [
+        {'id': 1000 + i, 'name': f"Reader {i}", 'email': f"reader{i}@example.com", 'password_hash': 'x',
+         'role': 'customer', 'city': 'Hyderabad'}
+        for i in range(REVIEWS_MAX_LIMIT + 10)
+    ])
+    db.session.execute(insert(Review), [
+        {'product_id': product_id, 'user_id': 1000 + i, 'rating': 5} for i in range(REVIEWS_MAX_LIMIT + 10)
+    ])
+    db.session.commit()
+    page = client.get(review_url(product_id), query_string={'limit': 500}).json
+    assert len(page['reviews']) == REVIEWS_MAX_LIMIT
+    assert page['nextCursor'] == page['reviews'][-1]['id']
+
+
+def test_totals_follow_create_update_delete(client, product_id, customers):
+    a, b, c = customers[:3]
+    ids = [client.post(review_url(product_id), json={'rating': rating}, headers=headers).json['id']
+           for rating, headers in ((5, a), (2, b), (4, c))]
+    assert assert_totals_match_reviews(product_id) == (3, pytest.approx(11 / 3))
+
+    assert client.put(review_url(product_id, ids[1]), json={'rating': 3}, headers=b).status_code == 200
+    # A comment-only edit keeps the rating
+    assert client.put(review_url(product_id, ids[0]), json={'comment': 'Still good'}, headers=a).json['rating'] == 5
+    assert assert_totals_match_reviews(product_id) == (3, pytest.approx(4))
+
+    assert client.delete(review_url(product_id, ids[2]), headers=c).status_code == 200
+    assert assert_totals_match_reviews(product_id) == (2, pytest.approx(4))
+    page = client.get(review_url(product_id)).json
+    assert (page['total'], page['average']) == (2, 4.0)
+
+    for review_id, headers in ((ids[0], a), (ids[1], b)):
+        client.delete(review_url(product_id, review_id), headers=headers)
+    assert assert_totals_match_reviews(product_id) == (0, None)
+    page = client.get(review_url(product_id)).json
+    assert (page['total'], page['average'], page['reviews']) == (0, None, [])
+
+
+def test_rejected_writes_leave_totals_alone(client, product_id, customers):
+    a, b = customers[:2]
+    review_id = client.post(review_url(product_id), json={'rating': 4}, headers=a).json['id']
+
+    assert client.post(review_url(product_id), json={'rating': 1}, headers=a).status_code == 409
+    assert client.post(review_url(product_id), json={'rating': 6}, headers=b).status_code == 400
+    assert client.post(review_url(product_id), json={'rating': 'five'}, headers=b).status_code == 400
+    assert client.put(review_url(product_id, review_id), json={'rating': 0}, headers=a).status_code == 400
+    assert client.put(review_url(product_id, review_id), json={'rating': 1}, headers=b).status_code == 403
+    assert client.delete(review_url(product_id, review_id), headers=b).status_code == 403
+    assert client.delete(review_url(product_id, review_id + 1), headers=a).status_code == 404
+    assert assert_totals_match_reviews(product_id) == (1, pytest.approx(4))
+
+
+def test_lists_and_watchlists_report_the_average(client, admin, product_id, customers):
+    for rating, headers in zip((5, 4, 4), customers):
+        client.post(review_url(product_id), json={'rating': rating}, headers=headers)
+
+    item = next(p for p in client.get('/api/products').json if p['id'] == product_id)
+    assert (item['rating'], item['rating_count']) == (4.33, 3)
+    watchlist = client.get('/api/analytics/inventory/low-stock', query_string={'threshold': 5}, headers=admin).json
+    assert [(p['productId'], p['averageRating']) for p in watchlist] == [(product_id, 4.33)]
@@ -0,0 +1,144 @@
+# backend/tests/test_sketches.py
+from datetime import date, datetime
+
+import pytest
+
+from sketches import ALL_SHOPS, HyperLogLog, SketchStore, period_key, periods_between
+
+
+def hll_of(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+@pytest.mark.parametrize('n', [10, 1000, 100_000])
+def test_hll_count_is_close(n):
+    assert abs(hll_of(range(n)).count() - n) <= max(1, n * 0.03)
+
+
+def test_hll_ignores_repeats():
+    assert hll_of(list(range(5000)) * 3).count() == hll_of(range(5000)).count()
+
+
+def test_hll_merge_is_idempotent_and_commutative():
+    a = hll_of(range(0, 60_000))
+    b = hll_of(range(40_000, 100_000))
+    ab = HyperLogLog(a.to_bytes()).merge(b)
+    ba = HyperLogLog(b.to_bytes()).merge(a)
+    assert ab.to_bytes() == ba.to_bytes()
+    assert abs(ab.count() - 100_000) <= 3000
+
+    again = HyperLogLog(ab.to_bytes()).merge(b).merge(a).merge(ab)
+    assert again.to_bytes() == ab.to_bytes()
+
+
+def test_hll_bytes_round_trip():
+    sketch = hll_of(range(777))
+    assert HyperLogLog(sketch.to_bytes()).count() == sketch.count()
+
+
+def test_period_keys():
+    assert period_key(date(2026, 2, 16), 'week') == '2026-W08'
+    assert period_key(date(2026, 1, 1), 'week') == '2026-W01'
+    assert period_key(date(2027, 1, 1), 'week') == '2026-W53'
+    assert period_key(date(2026, 2, 16), 'month') == '2026-02'
+
+
+def test_periods_between():
+    assert periods_between(date(2025, 11, 30), date(2026, 2, 1), 'month') == ['2025-11', '2025-12', '2026-01', '2026-02']
+    assert periods_between(date(2026, 1, 4), date(2026, 1, 5), 'week') == ['2026-W01', '2026-W02']
+    assert periods_between(date(2026, 3, 3), date(2026, 3, 3), 'week') == ['2026-W10']
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SketchStore(str(tmp_path / 'sketches.db'))
+
+
+def ms(day):
+    return int(datetime(day.year, day.month, day.day, 12).timestamp() * 1000)
+
+
+def test_funnel_counts_distinct_visitors_per_step(store):
+    day = date(2026, 3, 14)
+    store.record_events([
+        (ms(day), 'page_view', 'u1', 's1', -1, '{}'),
+        (ms(day), 'product_view', 'u1', 's1', 3, '{}'),
+        (ms(day), 'product_view', 'u1', 's1', 3, '{}'),
+        (ms(day), 'product_view', '', 's2', 3, '{}'),
+        (ms(day), 'add_to_cart', '', 's2', 3, '{}'),
+        (ms(day), 'begin_checkout', '', 's2', 4, '{}'),
+        (ms(day), 'product_view', '', '', 3, '{}'),  # No visitor: skipped
+    ])
+    store.record_order(9, {3}, datetime(2026, 3, 14, 13))
+
+    assert store.funnel(3, day, day) == {'visitors': 2, 'productViews': 2, 'addToCart': 1, 'checkout': 0, 'orders': 1}
+    assert store.funnel(ALL_SHOPS, day, day) == {
+        'visitors': 2, 'productViews': 2, 'addToCart': 1, 'checkout': 1, 'orders': 1,
+    }
+    assert store.funnel(3, date(2026, 3, 15), date(2026, 3, 20))['visitors'] == 0
+
+
+def test_funnel_merges_days_and_workers(tmp_path):
+    path = str(tmp_path / 'sketches.db')
+    first, second = SketchStore(path), SketchStore(path)
+    days = [date(2026, 3, 1), date(2026, 3, 2)]
+    # The same visitors on both days and through both workers count once
+    for worker in (first, second):
+        for day in days:
+            worker.record_events([(ms(day), 'product_view', f"u{i}", '', 5, '{}') for i in range(200)])
+        worker.flush()
+    first.record_events([(ms(days[1]), 'product_view', 'u-new', '', 5, '{}')])
+
+    visitors = [f"u{i}" for i in range(200)]
+    funnel = second.funnel(5, *days)
+    assert funnel['productViews'] == funnel['visitors'] == hll_of(visitors).count()
+    assert first.funnel(5, *days)['visitors'] == hll_of(visitors + ['u-new']).count()
+    assert first.funnel(5, days[0], days[0])['visitors'] == hll_of(visitors).count()
+
+
+def test_retention_by_first_order_cohort(store):
+    orders = {
+        datetime(2025, 12, 10): [5],
+        datetime(2026, 1, 5): [1, 2, 3, 5],
+        datetime(2026, 2, 7): [1, 2, 4],
+        datetime(2026, 3, 9): [1, 4],
+    }
+    for when, customers in orders.items():
+        for customer_id in customers:
+            store.record_order(customer_id, {3}, when)
+    # Another shop's orders stay out of shop 3's bitmaps
+    store.record_order(6, {4}, datetime(2026, 1, 5))
+
+    # Cohorts in the window: January {1, 2, 3} (5 ordered before it), February {4}
+    assert store.retention(3, date(2026, 1, 1), date(2026, 3, 31)) == [
+        {'period': 'Month 1', 'retentionRate': 75.0, 'cohortCustomers': 4},
+        {'period': 'Month 2', 'retentionRate': 33.33, 'cohortCustomers': 3},
+    ]
+    # Across all shops customer 6 joins the January cohort and never returns
+    assert store.retention(ALL_SHOPS, date(2026, 1, 1), date(2026, 3, 31))[0] == {
+        'period': 'Month 1', 'retentionRate': 60.0, 'cohortCustomers': 5,
+    }
+
+
+def test_retention_weekly_and_flush_is_repeatable(store):
+    store.record_order(1, {3}, datetime(2026, 3, 2))
+    store.record_order(2, {3}, datetime(2026, 3, 3))
+    store.flush()
+    store.record_order(1, {3}, datetime(2026, 3, 10))
+    store.record_order(1, {3}, datetime(2026, 3, 2))
+    store.flush()
+
+    assert store.retention(3, date(2026, 3, 2), date(2026, 3, 15), granularity='week') == [
+        {'period': 'Week 1', 'retentionRate': 50.0, 'cohortCustomers': 2},
+    ]
+
+
+def test_reset_clears_everything(store):
+    store.record_order(1, {3}, datetime(2026, 3, 2))
+    store.flush()
+    store.record_order(2, {3}, datetime(2026, 3, 2))
+    store.reset()
+    assert store.funnel(3, date(2026, 3, 2), date(2026, 3, 2))['orders'] == 0
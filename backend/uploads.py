@@ -0,0 +1,174 @@
+# backend/uploads.py
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional: without it only originals are served
+    Image = None
+
+# Read uploads in chunks of this size so a large file is never held in memory
+CHUNK_SIZE = 64 * 1024
+
+# Magic bytes -> file extension for the image types we accept
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+# Variant name -> longest side in pixels. Variants are always WebP.
+VARIANTS = {
+    'thumb': 200,
+    'medium': 600,
+}
+
+URL_PREFIX = '/api/upload/image/'
+
+
+class UploadError(ValueError):
+    pass
+
+
+def sniff_extension(head):
+    """Detect the image type from the first bytes of the file"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def variant_filename(digest, variant):
+    return f"{digest}_{variant}.webp"
+
+
+class ImageStore:
+    """Content-addressed image storage with background WebP variant generation.
+
+    Originals are stored as <sha256>.<ext>, so uploading the same bytes twice
+    returns the same file. Resized variants are written next to them as
+    <sha256>_<variant>.webp by a small worker pool, off the request thread.
+    """
+
+    def __init__(self, root, max_workers=2):
+        self.root = root
+        self.max_workers = max_workers
+        self._executor = None
+        os.makedirs(root, exist_ok=True)
+
+    @property
+    def executor(self):
+        # Created lazily so forked workers don't inherit a pool from the parent
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='thumbs')
+        return self._executor
+
+    def path_for(self, filename):
+        return os.path.join(self.root, filename)
+
+    def save(self, stream, max_bytes):
+        """Stream `stream` to disk while hashing it. Returns (filename, created)"""
+        digest = hashlib.sha256()
+        size = 0
+        extension = None
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if extension is None:
+                        extension = sniff_extension(chunk)
+                        if extension is None:
+                            raise UploadError("Unsupported image type")
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadError("Image is too large")
+                    digest.update(chunk)
+                    tmp.write(chunk)
+            if size == 0:
+                raise UploadError("Empty file")
+
+            filename = f"{digest.hexdigest()}.{extension}"
+            final_path = self.path_for(filename)
+            if os.path.exists(final_path):
+                os.remove(tmp_path)
+                return filename, False
+            os.replace(tmp_path, final_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.schedule_variants(filename)
+        return filename, True
+
+    def schedule_variants(self, filename):
+        if Image is None:
+            return None
+        return self.executor.submit(self.generate_variants, filename)
+
+    def generate_variants(self, filename):
+        """Write every missing WebP variant for an original"""
+        digest = filename.rsplit('.', 1)[0]
+        try:
+            with Image.open(self.path_for(filename)) as original:
+                original.load()
+                for variant, size in VARIANTS.items():
+                    target = self.path_for(variant_filename(digest, variant))
+                    if os.path.exists(target):
+                        continue
+                    image = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+                    image.thumbnail((size, size))
+                    # Write to a temp name first so readers never see a partial file
+                    tmp_path = f"{target}.tmp"
+                    image.save(tmp_path, 'WEBP', quality=80, method=4)
+                    os.replace(tmp_path, target)
+        except Exception as e:
+            print(f"Error generating variants for {filename}: {e}")
+
+    def resolve(self, filename, variant=None):
+        """Return (filename_on_disk, is_requested_variant) or None if missing"""
+        if not os.path.exists(self.path_for(filename)):
+            return None
+        if variant:
+            candidate = variant_filename(filename.rsplit('.', 1)[0], variant)
+            if os.path.exists(self.path_for(candidate)):
+                return candidate, True
+            return filename, False
+        return filename, True
+
+    def delete(self, filename):
+        digest = filename.rsplit('.', 1)[0]
+        for name in [filename] + [variant_filename(digest, v) for v in VARIANTS]:
+            path = self.path_for(name)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def is_valid_filename(filename):
+    """Only accept <sha256>.<ext> names, which also rules out path traversal"""
+    digest, _, extension = filename.partition('.')
+    return (
+        len(digest) == 64
+        and all(c in '0123456789abcdef' for c in digest)
+        and extension in {'jpg', 'png', 'gif', 'webp'}
+    )
+
+
+def image_url(filename, variant=None):
+    url = URL_PREFIX + filename
+    return f"{url}?variant={variant}" if variant else url
+
+
+def thumbnail_url(url):
+    """Thumbnail URL for a product image_url that points at our own storage"""
+    if url and url.startswith(URL_PREFIX) and '?' not in url:
+        return f"{url}?variant=thumb"
+    return url
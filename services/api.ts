@@ -63,4 +63,24 @@ api.interceptors.response.use(
   }
 );
 
+export interface BatchRequest {
+  method?: 'GET' | 'POST' | 'PUT' | 'DELETE' | 'PATCH';
+  path: string; // Relative to API_URL, e.g. '/auth/me'
+  body?: unknown;
+}
+
+export interface BatchResponse<T = any> {
+  status: number;
+  body: T;
+}
+
+// Several API calls in one round trip; consecutive GETs run concurrently on the server when parallel is set
+export const batch = async (requests: BatchRequest[], parallel = true): Promise<BatchResponse[]> => {
+  const response = await api.post('/batch', {
+    requests: requests.map((r) => ({ ...r, path: `/api${r.path}` })),
+    parallel,
+  });
+  return response.data.responses;
+};
+
 export default api;
\ No newline at end of file
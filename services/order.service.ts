@@ -121,7 +121,7 @@ const orderService = {
     currentLocation?: string;
     history: {
       status: string;
-      timestamp: string;
+      timestamp: string | null;
       location?: string;
     }[];
   }> {
@@ -134,6 +134,26 @@ const orderService = {
     }
   },
 
+  // Long-poll: resolves when the order's status version moves past `version`,
+  // or after `wait` seconds with `changed: false`
+  async waitForOrderUpdate(id: string, version: number, wait: number = 25): Promise<{
+    order_id: number;
+    status: string;
+    version: number;
+    changed: boolean;
+  }> {
+    try {
+      const response = await api.get(`/orders/${id}/track`, {
+        params: { version, wait },
+        timeout: (wait + 5) * 1000,
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error waiting for order update:', error);
+      throw error;
+    }
+  },
+
   async getOrderAnalytics(): Promise<{
     totalOrders: number;
     totalRevenue: number;
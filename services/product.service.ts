@@ -1,5 +1,5 @@
 import { Review } from '../types';
-import { default as api, default as API_URL } from './api';
+import api from './api';
 
 // Unified Product interface with proper typing
 export interface Product {
@@ -12,7 +12,8 @@ export interface Product {
   category: string;
   images: string[];
   shopId: number;
-  rating: number;
+  rating: number; // Average review rating, 0 without reviews
+  ratingCount?: number;
   stockStatus: 'in_stock' | 'low_stock' | 'out_of_stock';
   // Backend compatibility fields (optional)
   image_url?: string;
@@ -41,6 +42,41 @@ export interface ProductFilter {
   brand?: string;
 }
 
+export interface HomeSections {
+  featured: Product[];
+  bestSellers: Product[];
+  newArrivals: Product[];
+  categories: string[];
+}
+
+export interface FacetBucket {
+  min: number;
+  max: number | null; // null on the open-ended last bucket
+  count: number;
+}
+
+export interface ProductFacets {
+  total: number;
+  categories: { name: string; count: number; minPrice: number; maxPrice: number }[];
+  units: { name: string; count: number }[];
+  priceRange: { min: number; max: number } | null;
+  priceBuckets: FacetBucket[];
+  discountBuckets: FacetBucket[];
+}
+
+export interface ProductChange {
+  seq: number;
+  op: 'insert' | 'update' | 'delete';
+  id: number;
+  product?: Product; // Absent on deletes
+}
+
+export interface ProductChangesResponse {
+  changes: ProductChange[];
+  checkpoint: number; // Pass back as `since` on the next call
+  hasMore: boolean;
+}
+
 export interface ProductResponse {
   products: Product[];
   total: number;
@@ -124,7 +160,8 @@ const normalizeProduct = (product: any): Product => {
     category: String(product.category || 'Vegetables').trim(),
     images: normalizeImages(product.images, product.image_url),
     shopId: Number(product.shop_id || 0),
-    rating: Number(product.rating || 4.0),
+    rating: Number(product.rating || 0),
+    ratingCount: Number(product.rating_count || 0),
     stockStatus: getStockStatus(quantity),
     brand: product.brand ? String(product.brand).trim() : undefined,
     unit: product.unit ? String(product.unit).trim() : 'kg',
@@ -189,13 +226,14 @@ const productService = {
 
 
 
+  // Newest first; pass the returned nextCursor as `before` to load the next page
   async getProductReviews(productId: string, params?: {
-    page?: number;
+    before?: number;
     limit?: number;
-  }): Promise<{ reviews: Review[]; total: number }> {
+  }): Promise<{ reviews: Review[]; total: number; average: number | null; nextCursor: number | null }> {
     try {
       const queryParams = new URLSearchParams();
-      if (params?.page) queryParams.append('page', params.page.toString());
+      if (params?.before) queryParams.append('before', params.before.toString());
       if (params?.limit) queryParams.append('limit', params.limit.toString());
 
       const response = await api.get(`/products/${productId}/reviews?${queryParams.toString()}`);
@@ -224,22 +262,8 @@ const productService = {
     comment?: string;
   }): Promise<Review> {
     try {
-      const response = await fetch(
-        `${API_URL}/products/${productId}/reviews/${reviewId}`,
-        {
-          method: 'PUT',
-          headers: {
-            'Content-Type': 'application/json',
-          },
-          body: JSON.stringify(review),
-        }
-      );
-
-      if (!response.ok) {
-        throw new Error('Failed to update review');
-      }
-
-      return await response.json();
+      const response = await api.put(`/products/${productId}/reviews/${reviewId}`, review);
+      return response.data;
     } catch (error) {
       console.error('Error updating product review:', error);
       throw error;
@@ -248,16 +272,7 @@ const productService = {
 
   async deleteProductReview(productId: string, reviewId: string): Promise<void> {
     try {
-      const response = await fetch(
-        `${API_URL}/products/${productId}/reviews/${reviewId}`,
-        {
-          method: 'DELETE',
-        }
-      );
-
-      if (!response.ok) {
-        throw new Error('Failed to delete review');
-      }
+      await api.delete(`/products/${productId}/reviews/${reviewId}`);
     } catch (error) {
       console.error('Error deleting product review:', error);
       throw error;
@@ -266,6 +281,69 @@ const productService = {
 
 
 
+  // Products most often bought together with this one (product detail page, cart upsell)
+  getRelatedProducts: async (productId: number | string, limit = 10): Promise<Product[]> => {
+    try {
+      const response = await api.get(`/products/${productId}/related`, { params: { limit } });
+      return (Array.isArray(response.data) ? response.data : []).map(normalizeProduct);
+    } catch (error: any) {
+      handleApiError(error, 'Get Related Products');
+      throw error; // Re-throw to satisfy return type
+    }
+  },
+
+  // Category/unit counts and price/discount histograms for filter UIs, without downloading the catalogue
+  getFacets: async (scope?: { city?: string; shopId?: number }): Promise<ProductFacets> => {
+    try {
+      const params: Record<string, string | number> = {};
+      if (scope?.shopId) {
+        params.shop_id = scope.shopId;
+      } else if (scope?.city && scope.city !== 'All Cities') {
+        params.city = scope.city;
+      }
+      const response = await api.get('/products/facets', { params });
+      return response.data;
+    } catch (error: any) {
+      handleApiError(error, 'Get Facets');
+      throw error; // Re-throw to satisfy return type
+    }
+  },
+
+  // Catalogue changes since a checkpoint; since=0 returns the whole catalogue
+  getProductChanges: async (since = 0, limit = 500): Promise<ProductChangesResponse> => {
+    try {
+      const response = await api.get('/products/changes', { params: { since, limit } });
+      return {
+        changes: (response.data?.changes || []).map((change: any) => ({
+          ...change,
+          product: change.product ? normalizeProduct(change.product) : undefined,
+        })),
+        checkpoint: response.data?.checkpoint ?? since,
+        hasMore: Boolean(response.data?.hasMore),
+      };
+    } catch (error: any) {
+      handleApiError(error, 'Get Product Changes');
+      throw error; // Re-throw to satisfy return type
+    }
+  },
+
+  // Every home screen section in one request (served from memory by the backend)
+  getHome: async (city?: string): Promise<HomeSections> => {
+    try {
+      const params = city && city !== 'All Cities' ? { city } : {};
+      const response = await api.get('/home', { params });
+      return {
+        featured: (response.data?.featured || []).map(normalizeProduct),
+        bestSellers: (response.data?.bestSellers || []).map(normalizeProduct),
+        newArrivals: (response.data?.newArrivals || []).map(normalizeProduct),
+        categories: (response.data?.categories || []).map((c: any) => c.name),
+      };
+    } catch (error: any) {
+      handleApiError(error, 'Get Home');
+      throw error; // Re-throw to satisfy return type
+    }
+  },
+
   getFeaturedProducts: async (): Promise<Product[]> => {
     try {
       const response = await api.get('/products', { params: { featured: true, limit: 8 } });
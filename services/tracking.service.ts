@@ -3,6 +3,8 @@
  * Centralized event tracking with privacy compliance
  */
 
+import api from './api';
+
 interface TrackingEvent {
   name: string;
   properties?: Record<string, any>;
@@ -145,8 +147,7 @@ class TrackingService {
     this.eventQueue = [];
 
     try {
-      // In a real app, send to your tracking service
-      // await this.sendToTrackingService(events);
+      await api.post('/events/batch', { events });
       
       if (__DEV__) {
         console.log('📊 Flushing tracking events:', events.length);